@@ -1,103 +1,267 @@
 # back/main.py
 
-from fastapi import FastAPI
-from fastapi.responses import StreamingResponse
-from pydantic import BaseModel, Field
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Header, HTTPException
+from fastapi.responses import StreamingResponse, PlainTextResponse
 from utils.prompt import prompt_generator
-from services.llm import sendRequest
-from services.ieeeFormat import generate_ieee_paper
+from utils.schema import Schema, RegenerateSchema, BatchSchema
+from services.llm import GENERATORS, regenerateSections, cacheStats
+from services.executors import run_io, shutdown_pools
+from services.pipeline import admitted_paper_events, paper_meta, render_docx, warm_renderers
+from services.planner import plan_paper
+from services.digest import digest_overview
+from services.jobs import JobStore, JobQueue, QueueFull, follow_events
+from services.artifacts import artifacts, Artifact, DOCX_MIME
+from services.singleflight import flights, request_key
+from services.metrics import render_metrics
+from services.admission import admission, Overloaded
+from services.batch import batch_events, BATCH_MAX_PAPERS
 import json
-import asyncio
 
-app = FastAPI()
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    app.state.jobs = JobQueue(JobStore())
+    app.state.jobs.start()
+    await warm_renderers()
+    yield
+    await app.state.jobs.stop()
+    shutdown_pools()
 
-class Schema(BaseModel):
-    overview: str = Field(..., min_length=30)
-    format: str
-    npages: int
 
+app = FastAPI(lifespan=lifespan)
 
-def create_sse_message(stage: str, status: str, data: dict = None):
+
+def create_sse_message(stage: str, status: str, data: dict = None, event_id: int = None):
     """Create a Server-Sent Event message"""
     message = {
         "stage": stage,
         "status": status,
         "data": data or {}
     }
-    return f"data: {json.dumps(message)}\n\n"
+    prefix = f"id: {event_id}\n" if event_id is not None else ""
+    return f"{prefix}data: {json.dumps(message)}\n\n"
+
 
+SSE_HEADERS = {
+    "Cache-Control": "no-cache",
+    "Connection": "keep-alive",
+    "X-Accel-Buffering": "no"
+}
 
-async def generate_paper_stream(data: Schema):
-    """Generator function that yields status updates"""
-    
+
+def reserve_paper_slot():
+    """Admission for one new paper, or 429 with Retry-After when the wait queue is full"""
     try:
-        # Stage 1: Validation
-        yield create_sse_message("validation", "started")
-        await asyncio.sleep(0.5)  # Simulate validation time
-        
-        if len(data.overview.strip()) < 30:
-            yield create_sse_message("validation", "error", 
-                                    {"message": "Overview too short"})
-            return
-        
-        yield create_sse_message("validation", "completed")
-        
-        # Stage 2: Prompt Generation
-        yield create_sse_message("prompt_generation", "started")
-        prompt_result = prompt_generator(data.overview)
-        
-        if prompt_result["status"] != "done":
-            yield create_sse_message("prompt_generation", "error",
-                                    {"message": "Failed to generate prompt"})
-            return
-        
-        yield create_sse_message("prompt_generation", "completed")
-        
-        # Stage 3: LLM Response
-        yield create_sse_message("llm_response", "started")
-        llm_response = sendRequest(prompt_result["prompt"])
-        yield create_sse_message("llm_response", "completed")
-        
-        # Stage 4: Document Generation
-        yield create_sse_message("document_generation", "started")
-        output_file = generate_ieee_paper(llm_response)
-        yield create_sse_message("document_generation", "completed")
-        
-        # Final success message
-        yield create_sse_message("complete", "success", 
-                                {"file": output_file})
-        
-    except Exception as e:
-        yield create_sse_message("error", "failed",
-                                {"message": str(e)})
+        return admission.reserve()
+    except Overloaded as e:
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": str(e.retry_after)})
+
+
+class AdmittedStreamingResponse(StreamingResponse):
+    """StreamingResponse that gives back its admission ticket however the response ends.
+
+    The body generator's own `finally` never runs if the response fails before
+    the generator is first iterated (client gone before the headers were sent),
+    so the release must not depend on it. A ticket claimed by the paper run
+    (joined an identical run, or the run owns it) is left to that run.
+    """
+
+    def __init__(self, content, ticket=None, **kwargs):
+        super().__init__(content, **kwargs)
+        self.ticket = ticket
+
+    async def __call__(self, scope, receive, send):
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            if self.ticket is not None and not self.ticket.claimed:
+                self.ticket.release()
+
+
+async def generate_paper_stream(data: Schema, ticket=None):
+    """Generator function that yields status updates; identical concurrent requests share one run"""
+    async for stage, status, event_data in flights.run(
+        request_key(data), lambda: admitted_paper_events(data, ticket)
+    ):
+        yield create_sse_message(stage, status, event_data)
 
 
 @app.post("/generate-docs-stream")
 async def generate_docs_stream(data: Schema):
     """Streaming endpoint that sends real-time status updates"""
-    return StreamingResponse(
-        generate_paper_stream(data),
+    # identical in-flight requests attach to the running paper and need no slot of their own
+    ticket = None if request_key(data) in flights else reserve_paper_slot()
+    return AdmittedStreamingResponse(
+        generate_paper_stream(data, ticket),
+        ticket,
         media_type="text/event-stream",
-        headers={
-            "Cache-Control": "no-cache",
-            "Connection": "keep-alive",
-            "X-Accel-Buffering": "no"
-        }
+        headers=SSE_HEADERS
     )
 
 
 @app.post("/generate-docs")
 async def generate_docs(data: Schema):
     """Original non-streaming endpoint (kept for backwards compatibility)"""
-    prompt_result = prompt_generator(data.overview)
-    if prompt_result["status"] != "done":
-        return {"status": "error"}
+    ticket = reserve_paper_slot()
+    try:
+        async for _ in ticket.wait():
+            pass
 
-    llm_response = sendRequest(prompt_result["prompt"])
-    output_file = generate_ieee_paper(llm_response)
+        overview = await run_io(digest_overview, data.overview)
+        prompt_result = prompt_generator(overview)
+        if prompt_result["status"] != "done":
+            return {"status": "error"}
+
+        plan = plan_paper(data.npages)
+        sections = await run_io(GENERATORS[data.mode], prompt_result["prompt"], plan=plan)
+        docx, _ = await render_docx(sections)
+        paper_id = artifacts.put(docx, meta=paper_meta(prompt_result["prompt"], sections, plan, data.mode))
+    finally:
+        ticket.release()
 
     return {
         "status": "success",
-        "file": output_file
-    }
\ No newline at end of file
+        "paper_id": paper_id,
+        "url": f"/papers/{paper_id}"
+    }
+
+
+@app.post("/generate-docs-batch")
+async def generate_docs_batch(data: BatchSchema):
+    """Generate many papers on the shared batch pool, streaming each result as it completes"""
+    if len(data.papers) > BATCH_MAX_PAPERS:
+        raise HTTPException(status_code=413, detail=f"A batch may hold at most {BATCH_MAX_PAPERS} papers")
+
+    async def stream():
+        async for stage, status, event_data in batch_events(data.papers):
+            yield create_sse_message(stage, status, event_data)
+
+    return StreamingResponse(stream(), media_type="text/event-stream", headers=SSE_HEADERS)
+
+
+def stream_artifact(artifact: Artifact):
+    return StreamingResponse(
+        artifact.iter_chunks(),
+        media_type=artifact.media_type,
+        headers={
+            "Content-Disposition": f'attachment; filename="{artifact.filename}"',
+            "Content-Length": str(len(artifact.data))
+        }
+    )
+
+
+@app.get("/papers/{paper_id}")
+async def get_paper(paper_id: str):
+    """Stream a rendered paper while it is still held in the artifact store"""
+    artifact = artifacts.get(paper_id)
+    if artifact is None:
+        raise HTTPException(status_code=404, detail="Paper not found or expired")
+    return stream_artifact(artifact)
+
+
+@app.post("/papers/{paper_id}/regenerate")
+async def regenerate_paper(paper_id: str, data: RegenerateSchema):
+    """Regenerate only the named sections of a stored paper; the others keep their text.
+    The re-rendered paper gets a new id, the original stays available."""
+    artifact = artifacts.get(paper_id)
+    if artifact is None:
+        raise HTTPException(status_code=404, detail="Paper not found or expired")
+    meta = artifact.meta
+    if "sections" not in meta:
+        raise HTTPException(status_code=409, detail="Paper has no stored sections to regenerate from")
+    unknown = [name for name in data.sections if name not in meta["sections"]]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown sections: {', '.join(unknown)}")
+
+    ticket = reserve_paper_slot()
+    try:
+        async for _ in ticket.wait():
+            pass
+        sections = await run_io(regenerateSections, meta["prompt"], meta["sections"], set(data.sections), plan=meta["plan"])
+        docx, _ = await render_docx(sections)
+    finally:
+        ticket.release()
+
+    new_id = artifacts.put(docx, meta={**meta, "sections": sections, "parent": paper_id})
+    return {
+        "status": "success",
+        "paper_id": new_id,
+        "url": f"/papers/{new_id}",
+        "regenerated": data.sections
+    }
+
+
+@app.post("/jobs")
+async def create_job(data: Schema):
+    """Queue a paper for background generation"""
+    try:
+        job_id = await app.state.jobs.submit(data.model_dump())
+    except QueueFull as e:
+        raise HTTPException(status_code=429, detail=str(e))
+    return {
+        "status": "queued",
+        "job_id": job_id
+    }
+
+
+@app.get("/jobs/{job_id}")
+async def get_job(job_id: str):
+    job = await run_io(app.state.jobs.store.get, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return {
+        "job_id": job_id,
+        "status": job["status"],
+        "error": job["error"]
+    }
+
+
+@app.get("/jobs/{job_id}/events")
+async def job_events(job_id: str, last_event_id: int = Header(0)):
+    """Replay a job's progress after Last-Event-ID, then follow it live"""
+    store = app.state.jobs.store
+    if await run_io(store.get, job_id) is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+
+    async def stream():
+        async for seq, stage, status, event_data in follow_events(store, job_id, last_event_id):
+            yield create_sse_message(stage, status, event_data, event_id=seq)
+
+    return StreamingResponse(stream(), media_type="text/event-stream", headers=SSE_HEADERS)
+
+
+@app.get("/jobs/{job_id}/result")
+async def job_result(job_id: str):
+    job = await run_io(app.state.jobs.store.get, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    if job["status"] != "succeeded":
+        raise HTTPException(status_code=409, detail=f"Job is {job['status']}")
+    result = await run_io(app.state.jobs.store.get_result, job_id)
+    return stream_artifact(Artifact(result, "paper.docx", DOCX_MIME))
+
+
+@app.get("/stats")
+async def stats():
+    """Runtime counters (LLM cache hits/misses, coalesced paper requests, admission queue)"""
+    return {
+        "cache": cacheStats(),
+        "singleflight": flights.stats(),
+        "admission": admission.stats()
+    }
+
+
+@app.get("/metrics")
+async def metrics():
+    """Prometheus scrape endpoint: stage/LLM/DOCX histograms, token counters, cache/single-flight/admission stats"""
+    body = render_metrics({
+        "paperforge_cache": cacheStats(),
+        "paperforge_singleflight": flights.stats(),
+        "paperforge_admission": admission.stats(),
+    }, counters={
+        "paperforge_cache": ("hits", "disk_hits", "misses", "evictions", "expired"),
+        "paperforge_singleflight": ("started", "coalesced"),
+        "paperforge_admission": ("admitted", "rejected"),
+    })
+    return PlainTextResponse(body, media_type="text/plain; version=0.0.4")
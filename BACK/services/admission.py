@@ -0,0 +1,121 @@
+import os
+import math
+import time
+import asyncio
+from collections import deque
+
+# Papers generated at once; each fans out to several LLM calls, themselves capped
+# process-wide by LLM_MAX_CONNECTIONS
+MAX_INFLIGHT_PAPERS = int(os.getenv("MAX_INFLIGHT_PAPERS", "8"))
+
+# Papers allowed to wait for a slot; beyond this requests are rejected with 429
+ADMISSION_QUEUE_SIZE = int(os.getenv("ADMISSION_QUEUE_SIZE", "32"))
+
+# Assumed paper duration (seconds) for Retry-After until real runs have been timed
+DEFAULT_PAPER_SECONDS = 60.0
+
+
+class Overloaded(Exception):
+    def __init__(self, retry_after):
+        super().__init__(f"Server is at capacity, retry in {retry_after}s")
+        self.retry_after = retry_after
+
+
+class Ticket:
+    """A reserved place: either running (admitted) or waiting in line"""
+
+    def __init__(self, controller):
+        self.controller = controller
+        self.admitted = False
+        self.released = False
+        self.claimed = False
+        self.admitted_at = None
+
+    @property
+    def position(self):
+        """1-based place in the wait queue, 0 once admitted"""
+        if self.admitted:
+            return 0
+        return self.controller._waiting.index(self) + 1
+
+    async def wait(self):
+        """Yield the queue position every time it changes, until a slot is free"""
+        while not self.admitted:
+            changed = self.controller._changed
+            yield self.position
+            await changed.wait()
+
+    def release(self):
+        self.controller._release(self)
+
+
+class AdmissionController:
+    """Global cap on papers in flight with a bounded FIFO wait queue.
+
+    `reserve()` never blocks: it admits, queues, or raises Overloaded right away
+    so the endpoint can answer 429 with Retry-After before any work starts.
+    """
+
+    def __init__(self, limit=MAX_INFLIGHT_PAPERS, queue_size=ADMISSION_QUEUE_SIZE):
+        self.limit = limit
+        self.queue_size = queue_size
+        self.active = 0
+        self.admitted = 0
+        self.rejected = 0
+        self.paper_seconds = DEFAULT_PAPER_SECONDS
+        self._waiting = deque()
+        self._changed = asyncio.Event()
+
+    def reserve(self):
+        ticket = Ticket(self)
+        if self.active < self.limit and not self._waiting:
+            self._admit(ticket)
+        elif len(self._waiting) < self.queue_size:
+            self._waiting.append(ticket)
+        else:
+            self.rejected += 1
+            raise Overloaded(self.retry_after())
+        return ticket
+
+    def retry_after(self):
+        # roughly when the last queued paper would start, given the recent paper duration
+        rounds = (len(self._waiting) + 1) / max(1, self.limit)
+        return max(1, min(300, math.ceil(rounds * self.paper_seconds)))
+
+    def _admit(self, ticket):
+        ticket.admitted = True
+        ticket.admitted_at = time.monotonic()
+        self.active += 1
+        self.admitted += 1
+
+    def _release(self, ticket):
+        if ticket.released:
+            return
+        ticket.released = True
+        if ticket.admitted:
+            self.active -= 1
+            # moving average of paper duration, for Retry-After
+            seconds = time.monotonic() - ticket.admitted_at
+            self.paper_seconds = 0.8 * self.paper_seconds + 0.2 * seconds
+        else:
+            self._waiting.remove(ticket)
+        while self._waiting and self.active < self.limit:
+            self._admit(self._waiting.popleft())
+        self._notify()
+
+    def _notify(self):
+        changed, self._changed = self._changed, asyncio.Event()
+        changed.set()
+
+    def stats(self):
+        return {
+            "limit": self.limit,
+            "active": self.active,
+            "queued": len(self._waiting),
+            "admitted": self.admitted,
+            "rejected": self.rejected,
+            "paper_seconds": round(self.paper_seconds, 1),
+        }
+
+
+admission = AdmissionController()
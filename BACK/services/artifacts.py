@@ -0,0 +1,62 @@
+import os
+import time
+import uuid
+import threading
+
+# Rendered papers are kept in memory for this many seconds
+ARTIFACT_TTL = float(os.getenv("ARTIFACT_TTL", "3600"))
+
+DOCX_MIME = "application/vnd.openxmlformats-officedocument.wordprocessingml.document"
+
+
+class Artifact:
+    def __init__(self, data, filename, media_type, meta=None):
+        self.data = data
+        self.filename = filename
+        self.media_type = media_type
+        self.meta = meta or {}
+        self.created = time.time()
+
+    def iter_chunks(self, chunk_size=64 * 1024):
+        view = memoryview(self.data)
+        for start in range(0, len(view), chunk_size):
+            yield bytes(view[start:start + chunk_size])
+
+
+class ArtifactStore:
+    """In-memory store of rendered documents addressed by a random id, evicted after `ttl`"""
+
+    def __init__(self, ttl=ARTIFACT_TTL):
+        self.ttl = ttl
+        self._items = {}
+        self._lock = threading.Lock()
+
+    def put(self, data, filename="paper.docx", media_type=DOCX_MIME, meta=None):
+        artifact_id = uuid.uuid4().hex
+        with self._lock:
+            self._evict_expired()
+            self._items[artifact_id] = Artifact(data, filename, media_type, meta)
+        return artifact_id
+
+    def get(self, artifact_id):
+        with self._lock:
+            artifact = self._items.get(artifact_id)
+            if artifact is None:
+                return None
+            if time.time() - artifact.created > self.ttl:
+                del self._items[artifact_id]
+                return None
+            return artifact
+
+    def _evict_expired(self):
+        now = time.time()
+        for artifact_id in [k for k, a in self._items.items() if now - a.created > self.ttl]:
+            del self._items[artifact_id]
+
+    def __len__(self):
+        with self._lock:
+            self._evict_expired()
+            return len(self._items)
+
+
+artifacts = ArtifactStore()
@@ -0,0 +1,78 @@
+import os
+import time
+import uuid
+import asyncio
+from utils.prompt import prompt_generator
+from services.llm import GENERATORS
+from services.executors import run_batch, get_llm_scheduler
+from services.artifacts import artifacts
+from services.planner import plan_paper
+from services.digest import digest_overview
+from services.pipeline import paper_meta, render_docx
+
+# Max papers in one batch request
+BATCH_MAX_PAPERS = int(os.getenv("BATCH_MAX_PAPERS", "100"))
+
+
+def write_batch_paper(data, lane):
+    """Blocking part of a batch paper, on the batch pool: digest, prompt and section calls,
+    the LLM calls all through the paper's `lane`"""
+    started = time.perf_counter()
+    overview = digest_overview(data.overview, pool=lane)
+    prompt_result = prompt_generator(overview)
+    if prompt_result["status"] != "done":
+        raise RuntimeError("Failed to generate prompt")
+
+    plan = plan_paper(data.npages)
+    sections = GENERATORS[data.mode](prompt_result["prompt"], plan=plan, pool=lane)
+    return started, prompt_result["prompt"], sections, plan
+
+
+async def generate_batch_paper(data, lane):
+    """One paper of a batch: section calls go through `lane`, rendering through the process pool.
+    Returns the paper id and the seconds spent on it, time queued for the batch pool excluded."""
+    started, prompt, sections, plan = await run_batch(write_batch_paper, data, lane)
+    docx, _ = await render_docx(sections)
+    paper_id = artifacts.put(docx, meta=paper_meta(prompt, sections, plan, data.mode))
+    return paper_id, time.perf_counter() - started
+
+
+async def batch_events(papers):
+    """Generate many papers, yielding (stage, status, data) events as each one finishes.
+
+    Section calls of all papers are interleaved round-robin on the shared
+    FairScheduler, and papers of every batch request share the batch pool's
+    BATCH_PAPER_CONCURRENCY slots; a failed paper is reported and the rest of
+    the batch goes on.
+    """
+    batch_id = uuid.uuid4().hex
+    scheduler = get_llm_scheduler()
+
+    async def run(index, data):
+        try:
+            paper_id, seconds = await generate_batch_paper(data, scheduler.lane((batch_id, index)))
+        except Exception as e:
+            return index, None, str(e)
+        return index, {
+            "paper_id": paper_id,
+            "url": f"/papers/{paper_id}",
+            "seconds": round(seconds, 3),
+        }, None
+
+    yield "batch", "started", {"batch_id": batch_id, "papers": len(papers)}
+    tasks = [asyncio.create_task(run(index, data)) for index, data in enumerate(papers)]
+    succeeded = failed = 0
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            index, result, error = await next_done
+            if error is None:
+                succeeded += 1
+                yield "paper", "completed", {"index": index, **result}
+            else:
+                failed += 1
+                yield "paper", "failed", {"index": index, "message": error}
+        yield "batch", "completed", {"batch_id": batch_id, "succeeded": succeeded, "failed": failed}
+    finally:
+        # client went away: papers not started yet are dropped
+        for task in tasks:
+            task.cancel()
@@ -0,0 +1,107 @@
+import os
+import re
+from concurrent.futures import ThreadPoolExecutor
+
+from services import llm
+from services.cache import LLMCache, cache_key
+
+# Overviews longer than this many characters are condensed before generation (0 = never)
+OVERVIEW_DIGEST_THRESHOLD = int(os.getenv("OVERVIEW_DIGEST_THRESHOLD", "6000"))
+
+# Long overviews are summarized in chunks of about this many characters, then merged
+DIGEST_CHUNK_CHARS = int(os.getenv("DIGEST_CHUNK_CHARS", "12000"))
+
+# Target length of the digest handed to the section prompts
+DIGEST_WORDS = int(os.getenv("DIGEST_WORDS", "500"))
+
+# Finished digests are memoized here whether or not LLM_CACHE_ENABLED is set
+DIGEST_CACHE_SIZE = int(os.getenv("DIGEST_CACHE_SIZE", "64"))
+
+_digests = LLMCache(max_entries=DIGEST_CACHE_SIZE, ttl=llm.LLM_CACHE_TTL)
+
+
+def needs_digest(overview):
+    return 0 < OVERVIEW_DIGEST_THRESHOLD < len(overview)
+
+
+def split_chunks(text, size=None):
+    """Split on paragraph boundaries into chunks of at most `size` characters
+    (a single longer paragraph is cut at the last space before the limit)"""
+    size = size or DIGEST_CHUNK_CHARS
+    chunks, current = [], ""
+    for paragraph in re.split(r"\n\s*\n", text.strip()):
+        while len(paragraph) > size:
+            cut = paragraph.rfind(" ", 0, size)
+            cut = cut if cut > 0 else size
+            if current:
+                chunks.append(current)
+                current = ""
+            chunks.append(paragraph[:cut])
+            paragraph = paragraph[cut:].lstrip()
+        if current and len(current) + 2 + len(paragraph) > size:
+            chunks.append(current)
+            current = ""
+        current = f"{current}\n\n{paragraph}" if current else paragraph
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+def digest_prompt(text, words, part=None):
+    scope = f"part {part[0]} of {part[1]} of a project description" if part else "a project description"
+    return (
+        f"Below is {scope} that will be used to write a research paper. "
+        f"Condense it into a dense summary of at most {words} words. Keep every concrete fact: "
+        "the problem, goals, methods, algorithms, architecture, datasets, tools, metrics, results, "
+        "numbers and names. Drop repetition and filler. Reply with the summary text only.\n\n"
+        + text
+    )
+
+
+def digest_overview(overview, pool=None):
+    """Condense a long overview once; short ones are returned unchanged.
+
+    The finished digest is memoized by a hash of the overview and the digest
+    settings, independently of the LLM response cache, so repeat requests skip
+    the map-reduce even with LLM_CACHE_ENABLED=0. When the LLM cache is on, the
+    per-chunk summaries are cached there as well. Every call is submitted to
+    `pool` (a scheduler lane) when given.
+    """
+    if not needs_digest(overview):
+        return overview
+
+    key = cache_key("digest", DIGEST_WORDS, DIGEST_CHUNK_CHARS, overview)
+    digest = _digests.get(key)
+    if digest is None:
+        digest = condense(overview, pool)
+        if digest:
+            _digests.set(key, digest)
+    return digest
+
+
+def summarize(text, words, part=None):
+    return llm.getLLMResponse(digest_prompt(text, words, part), section="Digest", maxTokens=int(words * 1.33 * 1.5))
+
+
+def condense(overview, pool=None):
+    lane = pool
+
+    def call(*args):
+        return lane.submit(summarize, *args).result() if lane else summarize(*args)
+
+    chunks = split_chunks(overview)
+    if len(chunks) == 1:
+        return call(chunks[0], DIGEST_WORDS)
+
+    # map: summarize every chunk with its share of the word budget, then merge
+    words = max(100, DIGEST_WORDS * 2 // len(chunks))
+    ownPool = pool is None
+    if ownPool:
+        pool = ThreadPoolExecutor(max_workers=max(1, min(len(chunks), llm.LLM_CONCURRENCY)))
+    try:
+        futures = [pool.submit(summarize, chunk, words, (i, len(chunks))) for i, chunk in enumerate(chunks, start=1)]
+        parts = [future.result() for future in futures]
+    finally:
+        if ownPool:
+            pool.shutdown()
+    return call("\n\n".join(parts), DIGEST_WORDS)
@@ -0,0 +1,219 @@
+import os
+import time
+import asyncio
+import functools
+import threading
+import multiprocessing
+from collections import OrderedDict, deque
+from concurrent.futures import Future, ThreadPoolExecutor, ProcessPoolExecutor
+
+# I/O pool: blocking LLM calls (each paper also fans out its own section calls)
+IO_POOL_SIZE = int(os.getenv("IO_POOL_SIZE", "32"))
+
+# CPU pool: python-docx rendering, in separate processes (each one is a full interpreter with
+# python-docx loaded, so the default stays small; processes are started as renders need them)
+CPU_POOL_SIZE = int(os.getenv("CPU_POOL_SIZE", str(min(4, os.cpu_count() or 2))))
+
+# Shared LLM pool for batches: worker threads, and max calls started per second (0 = no limit)
+BATCH_LLM_WORKERS = int(os.getenv("BATCH_LLM_WORKERS", "8"))
+BATCH_RATE_LIMIT = float(os.getenv("BATCH_RATE_LIMIT", "0"))
+
+# Batch papers in progress at once across all batch requests: each holds one thread of
+# its own pool for the whole paper, so batches never take threads from the I/O pool
+BATCH_PAPER_CONCURRENCY = int(os.getenv("BATCH_PAPER_CONCURRENCY", "8"))
+
+_io_pool = None
+_cpu_pool = None
+_batch_pool = None
+_scheduler = None
+_lock = threading.Lock()
+
+
+def get_io_pool():
+    global _io_pool
+    with _lock:
+        if _io_pool is None:
+            _io_pool = ThreadPoolExecutor(max_workers=IO_POOL_SIZE, thread_name_prefix="paperforge-io")
+        return _io_pool
+
+
+def get_cpu_pool():
+    global _cpu_pool
+    with _lock:
+        if _cpu_pool is None:
+            # spawn, not fork: forked workers would inherit the server socket and the I/O threads
+            _cpu_pool = ProcessPoolExecutor(max_workers=CPU_POOL_SIZE, mp_context=multiprocessing.get_context("spawn"))
+        return _cpu_pool
+
+
+def get_batch_pool():
+    global _batch_pool
+    with _lock:
+        if _batch_pool is None:
+            _batch_pool = ThreadPoolExecutor(max_workers=BATCH_PAPER_CONCURRENCY, thread_name_prefix="paperforge-batch-paper")
+        return _batch_pool
+
+
+async def run_io(fn, *args, **kwargs):
+    """Run a blocking I/O call (LLM request) without blocking the event loop"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_io_pool(), functools.partial(fn, *args, **kwargs))
+
+
+async def run_cpu(fn, *args, **kwargs):
+    """Run a CPU-bound call (DOCX rendering) in the process pool"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_cpu_pool(), functools.partial(fn, *args, **kwargs))
+
+
+async def run_batch(fn, *args, **kwargs):
+    """Run the blocking part of one batch paper; queues once BATCH_PAPER_CONCURRENCY are running"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_batch_pool(), functools.partial(fn, *args, **kwargs))
+
+
+class IOStream:
+    """Bridge a blocking call that reports progress through a callback.
+
+    Pass `stream.emit` as the callback; `run` yields every emitted item on the
+    event loop while the call runs on the I/O pool, then stores its return
+    value in `stream.result`.
+    """
+
+    _done = object()
+
+    def __init__(self):
+        self.result = None
+        self._queue = asyncio.Queue()
+        self._loop = None
+
+    def emit(self, *item):
+        self._loop.call_soon_threadsafe(self._queue.put_nowait, item)
+
+    async def run(self, fn, *args, **kwargs):
+        self._loop = asyncio.get_running_loop()
+        task = asyncio.ensure_future(run_io(fn, *args, **kwargs))
+        task.add_done_callback(lambda _: self._queue.put_nowait(self._done))
+
+        while True:
+            item = await self._queue.get()
+            if item is self._done:
+                break
+            yield item
+
+        self.result = task.result()
+
+
+class FairScheduler:
+    """Thread pool that takes turns between lanes instead of running calls first come, first served.
+
+    Each paper submits its section calls to its own lane (`lane(key)` returns an
+    object with the Executor `submit` signature); workers pick the next call
+    round-robin across lanes, so a paper with many queued calls cannot starve the
+    others. `rate` caps how many calls start per second across all workers.
+    """
+
+    def __init__(self, workers=BATCH_LLM_WORKERS, rate=BATCH_RATE_LIMIT):
+        self.rate = rate
+        self._lanes = OrderedDict()
+        self._cond = threading.Condition()
+        self._next_start = 0.0
+        self._closed = False
+        self._threads = [
+            threading.Thread(target=self._work, name=f"paperforge-batch-{i}", daemon=True)
+            for i in range(workers)
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def lane(self, key):
+        return _Lane(self, key)
+
+    def submit(self, key, fn, *args, **kwargs):
+        future = Future()
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("scheduler is shut down")
+            self._lanes.setdefault(key, deque()).append((future, fn, args, kwargs))
+            self._cond.notify()
+        return future
+
+    def _take(self):
+        with self._cond:
+            while not self._lanes and not self._closed:
+                self._cond.wait()
+            if self._closed:
+                return None
+            # the lane at the head gives up one call and goes to the back of the line
+            key, calls = self._lanes.popitem(last=False)
+            item = calls.popleft()
+            if calls:
+                self._lanes[key] = calls
+            return item
+
+    def _throttle(self):
+        if self.rate <= 0:
+            return
+        with self._cond:
+            now = time.monotonic()
+            start = max(now, self._next_start)
+            self._next_start = start + 1 / self.rate
+        if start > now:
+            time.sleep(start - now)
+
+    def _work(self):
+        while True:
+            item = self._take()
+            if item is None:
+                return
+            future, fn, args, kwargs = item
+            if not future.set_running_or_notify_cancel():
+                continue
+            self._throttle()
+            try:
+                future.set_result(fn(*args, **kwargs))
+            except BaseException as e:
+                future.set_exception(e)
+
+    def shutdown(self):
+        with self._cond:
+            self._closed = True
+            for calls in self._lanes.values():
+                for future, *_ in calls:
+                    future.cancel()
+            self._lanes.clear()
+            self._cond.notify_all()
+
+
+class _Lane:
+    def __init__(self, scheduler, key):
+        self.scheduler = scheduler
+        self.key = key
+
+    def submit(self, fn, *args, **kwargs):
+        return self.scheduler.submit(self.key, fn, *args, **kwargs)
+
+
+def get_llm_scheduler():
+    global _scheduler
+    with _lock:
+        if _scheduler is None:
+            _scheduler = FairScheduler()
+        return _scheduler
+
+
+def shutdown_pools():
+    global _io_pool, _cpu_pool, _batch_pool, _scheduler
+    with _lock:
+        if _scheduler is not None:
+            _scheduler.shutdown()
+            _scheduler = None
+        if _batch_pool is not None:
+            _batch_pool.shutdown(wait=False, cancel_futures=True)
+            _batch_pool = None
+        if _io_pool is not None:
+            _io_pool.shutdown(wait=False, cancel_futures=True)
+            _io_pool = None
+        if _cpu_pool is not None:
+            _cpu_pool.shutdown(wait=True, cancel_futures=True)
+            _cpu_pool = None
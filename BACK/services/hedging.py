@@ -0,0 +1,68 @@
+import math
+import threading
+from collections import defaultdict, deque
+
+
+class LatencyTracker:
+    """Sliding window of recent call latencies per section, for picking hedge delays"""
+
+    def __init__(self, window=200, min_samples=20):
+        self.window = window
+        self.min_samples = min_samples
+        self._samples = defaultdict(lambda: deque(maxlen=self.window))
+        self._lock = threading.Lock()
+
+    def record(self, key, seconds):
+        with self._lock:
+            self._samples[key].append(seconds)
+
+    def percentile(self, key, pct):
+        """Nearest-rank percentile of the window, or None until `min_samples` are in"""
+        with self._lock:
+            samples = sorted(self._samples.get(key, ()))
+        if len(samples) < self.min_samples:
+            return None
+        rank = max(1, math.ceil(pct / 100 * len(samples)))
+        return samples[rank - 1]
+
+
+class HedgeBudget:
+    """Number of duplicate requests one paper may fire"""
+
+    def __init__(self, hedges):
+        self.remaining = hedges
+        self.used = 0
+        self._lock = threading.Lock()
+
+    def take(self):
+        with self._lock:
+            if self.remaining <= 0:
+                return False
+            self.remaining -= 1
+            self.used += 1
+            return True
+
+
+class CallHandle:
+    """Lets another thread abandon a streaming call: sets the flag and closes its stream"""
+
+    def __init__(self):
+        self.cancelled = False
+        self.stream = None
+        # set once the call holds a connection slot (or has given up before getting one)
+        self.started = threading.Event()
+        self._cancelEvent = threading.Event()
+
+    def sleep(self, seconds):
+        """time.sleep that wakes up early on cancel; True if the call was cancelled"""
+        return self._cancelEvent.wait(seconds)
+
+    def cancel(self):
+        self.cancelled = True
+        self._cancelEvent.set()
+        stream = self.stream
+        if stream is not None:
+            try:
+                stream.close()
+            except Exception:
+                pass
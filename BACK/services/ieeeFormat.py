@@ -1,9 +1,13 @@
-import re
+import copy
+from io import BytesIO
+from functools import lru_cache
 from docx import Document
 from docx.shared import Pt, Inches
+from docx.enum.style import WD_STYLE_TYPE
 from docx.enum.text import WD_ALIGN_PARAGRAPH
 from docx.oxml import OxmlElement
 from docx.oxml.ns import qn
+from utils.textclean import clean_text, split_references
 
 
 # --------------------------------------------------
@@ -36,79 +40,52 @@ def add_continuous_section(doc):
 
 
 # --------------------------------------------------
-# Clean messy LLM text (titles, separators, junk)
+# Two column layout for a section
 # --------------------------------------------------
-def clean_text(text: str) -> str:
-    lines = text.splitlines()
-    cleaned = []
-
-    for line in lines:
-        l = line.strip()
-
-        if not l:
-            continue
+def set_two_columns(section):
+    sectPr = section._sectPr
+    cols = sectPr.xpath("./w:cols")
+    if cols:
+        cols = cols[0]
+    else:
+        cols = OxmlElement("w:cols")
+        sectPr.append(cols)
 
-        # remove headings & noise
-        if re.match(r'^(abstract|introduction|methodology|results?|references?)$', l, re.I):
-            continue
-        if l.lower().startswith("title:"):
-            continue
-        if re.match(r'^[-_=]{3,}$', l):
-            continue
+    cols.set(qn("w:num"), "2")
+    cols.set(qn("w:space"), "720")
 
-        cleaned.append(line)
 
-    return "\n".join(cleaned).strip()
+# --------------------------------------------------
+# IEEE styles (defined once in the base template)
+# --------------------------------------------------
+IEEE_STYLES = {
+    # name: (size, bold, alignment)
+    "IEEE Title": (22, True, WD_ALIGN_PARAGRAPH.CENTER),
+    "IEEE Heading": (10, True, WD_ALIGN_PARAGRAPH.CENTER),
+    "IEEE Abstract": (9, True, WD_ALIGN_PARAGRAPH.JUSTIFY),
+    "IEEE Body": (9, False, WD_ALIGN_PARAGRAPH.JUSTIFY),
+}
+
+
+def add_ieee_styles(doc):
+    for name, (size, bold, alignment) in IEEE_STYLES.items():
+        style = doc.styles.add_style(name, WD_STYLE_TYPE.PARAGRAPH)
+        style.base_style = doc.styles["Normal"]
+        style.font.name = "Times New Roman"
+        style.font.size = Pt(size)
+        style.font.bold = bold
+        style.paragraph_format.alignment = alignment
+        if name != "IEEE Title":
+            style.paragraph_format.line_spacing = 1.0
+            style.paragraph_format.space_after = Pt(2.6)
 
 
 # --------------------------------------------------
-# Main IEEE Paper Generator
+# Base template: page setup, styles, title slot and the
+# continuous two column section, built once per process
 # --------------------------------------------------
-def generate_ieee_paper(paper: dict):
-
-    def set_two_columns(section):
-        sectPr = section._sectPr
-        cols = sectPr.xpath("./w:cols")
-        if cols:
-            cols = cols[0]
-        else:
-            cols = OxmlElement("w:cols")
-            sectPr.append(cols)
-
-        cols.set(qn("w:num"), "2")
-        cols.set(qn("w:space"), "720")
-
-    def add_section_heading(text):
-        p = doc.add_paragraph()
-        run = p.add_run(text)
-        run.font.name = "Times New Roman"
-        run.font.size = Pt(10)
-        run.bold = True
-        p.paragraph_format.alignment = WD_ALIGN_PARAGRAPH.CENTER
-        p.paragraph_format.space_after = Pt(2.6)
-
-    def add_bold_body(text):
-        p = doc.add_paragraph()
-        run = p.add_run(text)
-        run.font.name = "Times New Roman"
-        run.font.size = Pt(9)
-        run.bold = True
-        p.paragraph_format.alignment = WD_ALIGN_PARAGRAPH.JUSTIFY
-        p.paragraph_format.line_spacing = 1.0
-        p.paragraph_format.space_after = Pt(2.6)
-
-    def add_normal_body(text):
-        p = doc.add_paragraph()
-        run = p.add_run(text)
-        run.font.name = "Times New Roman"
-        run.font.size = Pt(9)
-        run.bold = False
-        p.paragraph_format.alignment = WD_ALIGN_PARAGRAPH.JUSTIFY
-        p.paragraph_format.line_spacing = 1.0
-        p.paragraph_format.space_after = Pt(2.6)
-
-    # ---------------- DOCUMENT SETUP ----------------
-
+@lru_cache(maxsize=1)
+def base_template():
     doc = Document()
     section = doc.sections[0]
 
@@ -119,25 +96,74 @@ def generate_ieee_paper(paper: dict):
     section.left_margin = Inches(0.5)
     section.right_margin = Inches(0.5)
 
-    # ---------------- TITLE ----------------
-
-    title = doc.add_paragraph()
-    run = title.add_run(paper.get("Title", ""))
-    run.font.name = "Times New Roman"
-    run.font.size = Pt(22)
-    run.bold = True
-    title.alignment = WD_ALIGN_PARAGRAPH.CENTER
-
-    # ---------------- TWO COLUMN CONTINUOUS ----------------
+    add_ieee_styles(doc)
+    doc.add_paragraph(style="IEEE Title")
 
     section = add_continuous_section(doc)
     set_two_columns(section)
+    return doc
+
+
+def warm_up():
+    # run in each render worker at startup so the first paper does not pay for the template
+    base_template()
+
+
+def new_ieee_document():
+    """Clone of the parsed base template, ready for one paper's content"""
+    template = base_template()
+    package = template.part.package
+
+    # only the document part changes per paper; styles, theme, settings etc. are shared read-only
+    memo = {id(part): part for part in package.iter_parts() if part is not template.part}
+    return copy.deepcopy(package, memo).main_document_part.document
+
+
+def add_styled_paragraph(doc, text, style_id):
+    # paragraphs only reference a style (no inline run formatting) and are
+    # built directly as XML, one w:t per line instead of python-docx's per-character loop
+    p = doc.element.body.add_p()
+    p.get_or_add_pPr().style = style_id
+    r = p.add_r()
+    for i, line in enumerate(text.split("\n")):
+        if i:
+            r.add_br()
+        for j, part in enumerate(line.split("\t")):
+            if j:
+                r.add_tab()
+            if part:
+                r.add_t(part)
+    return p
+
+
+# --------------------------------------------------
+# Per-section text preparation
+# --------------------------------------------------
+def prepare_section(name, text):
+    # the cheap part of rendering, safe to do as each section lands:
+    # body text is cleaned, Title and References are used as they are
+    return text if name in ("Title", "References") else clean_text(text)
+
+
+# --------------------------------------------------
+# Main IEEE Paper Generator
+# --------------------------------------------------
+def generate_ieee_paper(paper: dict, clean=True):
+    # with clean=False the texts are taken as already passed through prepare_section
+    prepare = clean_text if clean else (lambda text: text)
+
+    doc = new_ieee_document()
+    styles = {name: doc.styles[name].style_id for name in IEEE_STYLES}
+
+    # ---------------- TITLE ----------------
+
+    doc.paragraphs[0].add_run(paper.get("Title", ""))
 
     # ---------------- ABSTRACT ----------------
 
     if "Abstract" in paper:
-        add_section_heading("Abstract")
-        add_bold_body(clean_text(paper["Abstract"]))
+        add_styled_paragraph(doc, "Abstract", styles["IEEE Heading"])
+        add_styled_paragraph(doc, prepare(paper["Abstract"]), styles["IEEE Abstract"])
 
     # ---------------- MAIN SECTIONS ----------------
 
@@ -146,32 +172,32 @@ def generate_ieee_paper(paper: dict):
 
     for idx, key in enumerate(section_keys, start=1):
         roman = to_roman(idx)
-        add_section_heading(f"{roman}. {key}")
-        add_normal_body(clean_text(paper[key]))
+        add_styled_paragraph(doc, f"{roman}. {key}", styles["IEEE Heading"])
+        add_styled_paragraph(doc, prepare(paper[key]), styles["IEEE Body"])
         doc.add_paragraph("")
 
     # ---------------- REFERENCES ----------------
 
     if "References" in paper:
-        add_section_heading("References")
+        add_styled_paragraph(doc, "References", styles["IEEE Heading"])
+        for ref in split_references(paper["References"]):
+            add_styled_paragraph(doc, ref, styles["IEEE Body"])
+
+    # ---------------- SAVE ----------------
 
-        refs = paper["References"]
-        if isinstance(refs, str):
-            ref_list = re.split(r'\n\s*\n|\n\[\d+\]', refs)
-            ref_list = [r.strip() for r in ref_list if r.strip()]
-        else:
-            ref_list = refs
+    buffer = BytesIO()
+    doc.save(buffer)
+    data = buffer.getvalue()
 
-        for ref in ref_list:
-            add_normal_body(ref)
+    # writing to disk is opt-in; concurrent requests must not share a path
+    output_file = paper.get("output_file")
+    if output_file:
+        with open(output_file, "wb") as f:
+            f.write(data)
+        print(f"✅ DOCX created successfully → {output_file}")
 
-    # ---------------- SAVE ----------------
+    return data
 
-    output_file = paper.get("output_file", "output.docx")
-    doc.save(output_file)
-    print(f"✅ DOCX created successfully → {output_file}")
-    
-    
 
 # ---------------- EXAMPLE USAGE ----------------
 
@@ -0,0 +1,298 @@
+import os
+import json
+import time
+import uuid
+import asyncio
+import sqlite3
+import threading
+from utils.schema import Schema
+from services.pipeline import paper_events
+from services.artifacts import artifacts
+from services.executors import run_io
+
+JOBS_DB_PATH = os.getenv("JOBS_DB_PATH", "jobs.sqlite")
+
+# In-process workers (0 = API only; run `python -m services.jobs` to process jobs elsewhere)
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2"))
+
+# Max jobs waiting to start; further submissions are rejected
+JOB_QUEUE_SIZE = int(os.getenv("JOB_QUEUE_SIZE", "100"))
+
+JOB_POLL_INTERVAL = float(os.getenv("JOB_POLL_INTERVAL", "0.5"))
+
+# A running job whose worker has not renewed its lease for this long is assumed orphaned
+# and requeued; workers renew every JOB_HEARTBEAT_SECONDS, whatever the job is doing
+JOB_LEASE_SECONDS = float(os.getenv("JOB_LEASE_SECONDS", "600"))
+JOB_HEARTBEAT_SECONDS = float(os.getenv("JOB_HEARTBEAT_SECONDS", str(JOB_LEASE_SECONDS / 4)))
+
+# Finished jobs (event log and result document) are deleted this long after they end
+JOB_RETENTION_SECONDS = float(os.getenv("JOB_RETENTION_SECONDS", "86400"))
+JOB_PRUNE_INTERVAL = float(os.getenv("JOB_PRUNE_INTERVAL", "60"))
+
+FINISHED = ("succeeded", "failed")
+
+
+class QueueFull(Exception):
+    pass
+
+
+class JobStore:
+    """SQLite-backed job table plus an append-only log of each job's progress events"""
+
+    def __init__(self, path=JOBS_DB_PATH):
+        self._db = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._lock = threading.Lock()
+        with self._lock:
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("PRAGMA synchronous=NORMAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS jobs ("
+                "id TEXT PRIMARY KEY, status TEXT NOT NULL, payload TEXT NOT NULL, "
+                "result BLOB, error TEXT, created REAL NOT NULL, updated REAL NOT NULL)"
+            )
+            self._db.execute("CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, created)")
+            self._db.execute("CREATE INDEX IF NOT EXISTS jobs_updated ON jobs (status, updated)")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS job_events ("
+                "job_id TEXT NOT NULL, seq INTEGER NOT NULL, stage TEXT NOT NULL, "
+                "status TEXT NOT NULL, data TEXT NOT NULL, PRIMARY KEY (job_id, seq))"
+            )
+            self._db.commit()
+
+    def _execute(self, sql, params=()):
+        with self._lock:
+            cursor = self._db.execute(sql, params)
+            rows = cursor.fetchall()
+            self._db.commit()
+            return rows
+
+    def create(self, payload, max_queued=None):
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        with self._lock:
+            if max_queued is not None:
+                queued = self._db.execute("SELECT COUNT(*) FROM jobs WHERE status = 'queued'").fetchone()[0]
+                if queued >= max_queued:
+                    raise QueueFull(f"{queued} jobs already queued")
+            self._db.execute(
+                "INSERT INTO jobs (id, status, payload, created, updated) VALUES (?, 'queued', ?, ?, ?)",
+                (job_id, json.dumps(payload), now, now),
+            )
+            self._db.commit()
+        return job_id
+
+    def get(self, job_id):
+        rows = self._execute(
+            "SELECT id, status, payload, error, created, updated FROM jobs WHERE id = ?",
+            (job_id,),
+        )
+        if not rows:
+            return None
+        row = rows[0]
+        return {
+            "id": row[0],
+            "status": row[1],
+            "payload": json.loads(row[2]),
+            "error": row[3],
+            "created": row[4],
+            "updated": row[5],
+        }
+
+    def get_result(self, job_id):
+        rows = self._execute("SELECT result FROM jobs WHERE id = ?", (job_id,))
+        return rows[0][0] if rows else None
+
+    def claim_next(self):
+        """Atomically move the oldest queued job to running; returns its id or None"""
+        rows = self._execute(
+            "UPDATE jobs SET status = 'running', updated = ? WHERE id = "
+            "(SELECT id FROM jobs WHERE status = 'queued' ORDER BY created LIMIT 1) "
+            "AND status = 'queued' RETURNING id",
+            (time.time(),),
+        )
+        return rows[0][0] if rows else None
+
+    def requeue_stale(self, lease=JOB_LEASE_SECONDS, exclude=()):
+        # jobs left running by a crashed or restarted worker start over; their log is reset.
+        # `exclude`: jobs the caller is running itself, alive whatever their lease says
+        now = time.time()
+        with self._lock:
+            stale = [row[0] for row in self._db.execute(
+                "SELECT id FROM jobs WHERE status = 'running' AND updated < ?", (now - lease,)
+            ) if row[0] not in exclude]
+            for job_id in stale:
+                self._db.execute("DELETE FROM job_events WHERE job_id = ?", (job_id,))
+                self._db.execute("UPDATE jobs SET status = 'queued', updated = ? WHERE id = ?", (now, job_id))
+            self._db.commit()
+        return stale
+
+    def touch(self, job_id):
+        """Renew a running job's lease"""
+        self._execute("UPDATE jobs SET updated = ? WHERE id = ? AND status = 'running'", (time.time(), job_id))
+
+    def finish(self, job_id, status, result=None, error=None):
+        self._execute(
+            "UPDATE jobs SET status = ?, result = ?, error = ?, updated = ? WHERE id = ?",
+            (status, result, error, time.time(), job_id),
+        )
+
+    def prune(self, retention=JOB_RETENTION_SECONDS):
+        """Delete jobs that finished more than `retention` seconds ago; returns how many"""
+        cutoff = time.time() - retention
+        with self._lock:
+            old = [row[0] for row in self._db.execute(
+                "SELECT id FROM jobs WHERE status IN ('succeeded', 'failed') AND updated < ?", (cutoff,)
+            )]
+            for job_id in old:
+                self._db.execute("DELETE FROM job_events WHERE job_id = ?", (job_id,))
+                self._db.execute("DELETE FROM jobs WHERE id = ?", (job_id,))
+            self._db.commit()
+        return len(old)
+
+    def add_event(self, job_id, stage, status, data):
+        with self._lock:
+            seq = self._db.execute(
+                "SELECT COALESCE(MAX(seq), 0) + 1 FROM job_events WHERE job_id = ?", (job_id,)
+            ).fetchone()[0]
+            self._db.execute(
+                "INSERT INTO job_events (job_id, seq, stage, status, data) VALUES (?, ?, ?, ?, ?)",
+                (job_id, seq, stage, status, json.dumps(data)),
+            )
+            # progress doubles as the worker's lease heartbeat
+            self._db.execute("UPDATE jobs SET updated = ? WHERE id = ?", (time.time(), job_id))
+            self._db.commit()
+        return seq
+
+    def events_after(self, job_id, seq=0):
+        rows = self._execute(
+            "SELECT seq, stage, status, data FROM job_events WHERE job_id = ? AND seq > ? ORDER BY seq",
+            (job_id, seq),
+        )
+        return [(row[0], row[1], row[2], json.loads(row[3])) for row in rows]
+
+
+async def run_job(store, job_id):
+    """Run one job, logging its events; store calls go through the I/O pool, off the event loop.
+
+    Token deltas are not logged one by one: each section's text is written as a
+    single section_delta just before its section_completed.
+    """
+    job = await run_io(store.get, job_id)
+    result, error = None, None
+    deltas = {}
+    # events now come only at section boundaries, so the lease is renewed on a timer
+    heartbeat = asyncio.create_task(keep_alive(store, job_id))
+
+    try:
+        async for stage, event_status, data in paper_events(Schema(**job["payload"])):
+            if event_status == "section_delta":
+                if data.get("reset"):
+                    deltas.pop(data["section"], None)
+                else:
+                    deltas.setdefault(data["section"], []).append(data["chunk"])
+                continue
+            if event_status == "section_completed" and data["section"] in deltas:
+                text = "".join(deltas.pop(data["section"]))
+                await run_io(store.add_event, job_id, stage, "section_delta", {"section": data["section"], "chunk": text})
+            if event_status == "success":
+                # keep the document with the job so any API process can serve it; the paper id
+                # only exists in this worker's memory, so clients are sent to the job's result
+                result = artifacts.get(data["paper_id"]).data
+                data = {**data, "url": f"/jobs/{job_id}/result"}
+                data.pop("paper_id")
+            await run_io(store.add_event, job_id, stage, event_status, data)
+            if event_status in ("error", "failed"):
+                error = data.get("message")
+    finally:
+        heartbeat.cancel()
+
+    await run_io(store.finish, job_id, "succeeded" if result is not None else "failed", result, error)
+
+
+async def keep_alive(store, job_id):
+    while True:
+        await asyncio.sleep(JOB_HEARTBEAT_SECONDS)
+        await run_io(store.touch, job_id)
+
+
+class JobQueue:
+    """Worker tasks that claim queued jobs from the store and run them"""
+
+    def __init__(self, store, workers=JOB_WORKERS, max_queued=JOB_QUEUE_SIZE):
+        self.store = store
+        self.workers = workers
+        self.max_queued = max_queued
+        self._wakeup = asyncio.Event()
+        self._tasks = []
+        self._running = set()
+
+    async def submit(self, payload):
+        job_id = await run_io(self.store.create, payload, max_queued=self.max_queued)
+        self._wakeup.set()
+        return job_id
+
+    def start(self):
+        self.store.requeue_stale()
+        self._last_prune = 0.0
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def _maintain(self):
+        await run_io(self.store.requeue_stale, exclude=set(self._running))
+        if time.monotonic() - self._last_prune >= JOB_PRUNE_INTERVAL:
+            self._last_prune = time.monotonic()
+            await run_io(self.store.prune)
+
+    async def _worker(self):
+        while True:
+            job_id = await run_io(self.store.claim_next)
+            if job_id is None:
+                await self._maintain()
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), JOB_POLL_INTERVAL)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            self._running.add(job_id)
+            try:
+                await run_job(self.store, job_id)
+            except Exception as e:
+                await run_io(self.store.finish, job_id, "failed", error=str(e))
+            finally:
+                self._running.discard(job_id)
+
+
+async def follow_events(store, job_id, last_event_id=0):
+    """Replay a job's events after `last_event_id`, then follow new ones until the job finishes"""
+    seq = last_event_id
+    while True:
+        events = await run_io(store.events_after, job_id, seq)
+        for event in events:
+            seq = event[0]
+            yield event
+
+        if not events:
+            job = await run_io(store.get, job_id)
+            if job is None or job["status"] in FINISHED:
+                # pick up anything written between the two reads
+                for event in await run_io(store.events_after, job_id, seq):
+                    yield event
+                return
+            await asyncio.sleep(JOB_POLL_INTERVAL)
+
+
+async def main():
+    # standalone worker process: python -m services.jobs
+    queue = JobQueue(JobStore(), workers=max(JOB_WORKERS, 1))
+    queue.start()
+    await asyncio.gather(*queue._tasks)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -1,45 +1,510 @@
 import os
+import time
+import random
+import functools
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import openai
 from openai import OpenAI
 import json
+from services.cache import LLMCache, cache_key
+from services import metrics
+from services.hedging import LatencyTracker, HedgeBudget, CallHandle
+from utils.jsonstream import StreamingObjectParser
 
-def getLLMResponse(prompt):
-    client = OpenAI(
-        base_url="https://router.huggingface.co/v1",
-        api_key="",
-    )
+LLM_BASE_URL = os.getenv("LLM_BASE_URL", "https://router.huggingface.co/v1")
+LLM_API_KEY = os.getenv("LLM_API_KEY", "")
+LLM_MODEL = os.getenv("LLM_MODEL", "meta-llama/Llama-3.1-8B-Instruct:novita")
+
+# Per-call timeout in seconds and retry policy for 429/5xx/connection errors
+LLM_TIMEOUT = float(os.getenv("LLM_TIMEOUT", "120"))
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "4"))
+LLM_BACKOFF_BASE = float(os.getenv("LLM_BACKOFF_BASE", "0.5"))
+LLM_BACKOFF_MAX = float(os.getenv("LLM_BACKOFF_MAX", "20"))
+
+# Ask for token usage in the final stream chunk (stream_options.include_usage)
+LLM_STREAM_USAGE = os.getenv("LLM_STREAM_USAGE", "1") == "1"
+
+# Opt-in request hedging: a section call still running after the LLM_HEDGE_PERCENTILE
+# of recent latencies for that section (and at least LLM_HEDGE_MIN_DELAY seconds) gets a
+# duplicate request; each paper may fire at most LLM_HEDGE_BUDGET of them
+LLM_HEDGE_ENABLED = os.getenv("LLM_HEDGE_ENABLED", "0") == "1"
+LLM_HEDGE_PERCENTILE = float(os.getenv("LLM_HEDGE_PERCENTILE", "95"))
+LLM_HEDGE_MIN_DELAY = float(os.getenv("LLM_HEDGE_MIN_DELAY", "2"))
+LLM_HEDGE_BUDGET = int(os.getenv("LLM_HEDGE_BUDGET", "2"))
+LLM_HEDGE_WINDOW = int(os.getenv("LLM_HEDGE_WINDOW", "200"))
+LLM_HEDGE_MIN_SAMPLES = int(os.getenv("LLM_HEDGE_MIN_SAMPLES", "20"))
+
+# Process-wide cap on concurrent provider calls (and so on open connections)
+LLM_MAX_CONNECTIONS = int(os.getenv("LLM_MAX_CONNECTIONS", "16"))
+
+# Section response cache: in-memory LRU, plus a SQLite file when LLM_CACHE_PATH is set
+LLM_CACHE_ENABLED = os.getenv("LLM_CACHE_ENABLED", "1") == "1"
+LLM_CACHE_SIZE = int(os.getenv("LLM_CACHE_SIZE", "512"))
+LLM_CACHE_TTL = float(os.getenv("LLM_CACHE_TTL", "86400"))
+LLM_CACHE_PATH = os.getenv("LLM_CACHE_PATH", "")
+LLM_CACHE_DISK_MAX = int(os.getenv("LLM_CACHE_DISK_MAX", "10000"))
+
+SECTIONS = ['Abstract', 'Introduction', 'Literature Review', 'Methodology', 'Results']
+SECTION_PARAS = [1, 5, 7, 8, 7]
+
+# Max number of section calls one paper may have in flight (1 = sequential)
+LLM_CONCURRENCY = int(os.getenv("LLM_CONCURRENCY", "6"))
+
+# When enabled, References are generated from an excerpt of each body section, so they
+# wait for the body instead of running alongside it; off by default to keep the paper's
+# critical path at one section call. The excerpt bounds the extra prompt tokens
+REFERENCES_USE_SECTIONS = os.getenv("REFERENCES_USE_SECTIONS", "0") == "1"
+REFERENCES_EXCERPT_CHARS = int(os.getenv("REFERENCES_EXCERPT_CHARS", "600"))
+
+# Extra max_tokens for the JSON keys and escaping in single-call mode
+STRUCTURED_OVERHEAD_TOKENS = 200
 
-    completion = client.chat.completions.create(
-        model="meta-llama/Llama-3.1-8B-Instruct:novita",
+
+_client = None
+_clientLock = threading.Lock()
+_hedgePool = None
+_latencies = LatencyTracker(window=LLM_HEDGE_WINDOW, min_samples=LLM_HEDGE_MIN_SAMPLES)
+_semaphore = threading.BoundedSemaphore(LLM_MAX_CONNECTIONS)
+
+_cache = LLMCache(
+    max_entries=LLM_CACHE_SIZE,
+    ttl=LLM_CACHE_TTL,
+    path=LLM_CACHE_PATH or None,
+    max_disk_entries=LLM_CACHE_DISK_MAX,
+)
+
+RETRYABLE_ERRORS = (openai.RateLimitError, openai.InternalServerError, openai.APIConnectionError)
+
+
+def getClient():
+    # one client per process so every call reuses its keep-alive connection pool
+    global _client
+    with _clientLock:
+        if _client is None:
+            _client = OpenAI(
+                base_url=LLM_BASE_URL,
+                api_key=LLM_API_KEY,
+                timeout=LLM_TIMEOUT,
+                max_retries=0,
+            )
+        return _client
+
+
+def backoffDelay(attempt, error=None):
+    # honour the provider's Retry-After on 429, otherwise full-jitter exponential backoff
+    response = getattr(error, "response", None)
+    if response is not None:
+        retryAfter = response.headers.get("retry-after")
+        if retryAfter:
+            try:
+                return min(float(retryAfter), LLM_BACKOFF_MAX)
+            except ValueError:
+                pass
+    return random.uniform(0, min(LLM_BACKOFF_MAX, LLM_BACKOFF_BASE * (2 ** attempt)))
+
+
+def streamCompletion(prompt, onDelta=None, timeout=None, maxTokens=None, stats=None, handle=None):
+    """Stream one completion; `stats` (a dict) gets ttft and the provider's token usage.
+    Cancelling `handle` (services.hedging.CallHandle) stops it and returns the text so far."""
+    extra = {"max_tokens": maxTokens} if maxTokens else {}
+    if LLM_STREAM_USAGE:
+        extra["stream_options"] = {"include_usage": True}
+    if handle is not None and handle.cancelled:
+        return ""
+    start = time.perf_counter()
+    stream = getClient().chat.completions.create(
+        model=LLM_MODEL,
         messages=[
             {
                 "role": "user",
                 "content": "Take as much as time you need, but read the following things thoroughly and generate the required text: " + prompt
             }
         ],
+        stream=True,
+        timeout=LLM_TIMEOUT if timeout is None else timeout,
+        **extra,
     )
-    
-    return completion.choices[0].message.content
-
-def sendRequest(prompt):
-    sections = ['Abstract', 'Introduction', 'Literature Review', 'Methodology', 'Results']
-    sectionParas = [1, 5, 7, 8, 7]
-    text = {}
-    
-    llmPrompt = prompt + "\n\nNow, I want you to generate a normal one line of small TITLE based on the overview given to you."
-    response = getLLMResponse(llmPrompt)
-    text['Title'] = response
-    
-    for i in range(len(sections)):
-        llmPrompt = prompt + f"\n\nI want you to generate {sectionParas[i]} paragraphs on the {sections[i]} section of the research paper, make sure you generate detailed content."
-        response = getLLMResponse(llmPrompt)
-        text[sections[i]] = response
-        
-    llmPrompt = prompt + "\n\nNow, I want you to generate a some References for the research paper based on the content generated above. Make sure the references are in IEEE format. And the references that you give must be in points, they must not in paragraphs."
-    response = getLLMResponse(llmPrompt)
-    text['References'] = response
-    
-    # print(type(text))
-    # print(text)
+    if handle is not None:
+        handle.stream = stream
+        if handle.cancelled:
+            stream.close()
+            return ""
+
+    parts = []
+    try:
+        for chunk in stream:
+            if handle is not None and handle.cancelled:
+                break
+            usage = getattr(chunk, "usage", None)
+            if usage and stats is not None:
+                stats["prompt_tokens"] = usage.prompt_tokens
+                stats["completion_tokens"] = usage.completion_tokens
+            if not chunk.choices:
+                continue
+            delta = chunk.choices[0].delta.content
+            if delta:
+                if not parts and stats is not None:
+                    stats["ttft"] = time.perf_counter() - start
+                parts.append(delta)
+                if onDelta:
+                    onDelta(delta)
+    except Exception:
+        # closing the stream from another thread surfaces here as a read error
+        if handle is not None and handle.cancelled:
+            return "".join(parts)
+        raise
+
+    return "".join(parts)
+
+
+def cacheStats():
+    return _cache.stats()
+
+
+def getLLMResponse(prompt, onDelta=None, timeout=None, section=None, useCache=True, maxTokens=None, stats=None, hedge=None, pool=None):
+    """onDelta(chunk) gets each text delta; onDelta(None) means a retry restarted the text.
+    `stats`, if given, is filled with seconds, cached, attempts, ttft and token counts.
+    `hedge` (a services.hedging.HedgeBudget) allows a duplicate request for a slow call; it is
+    submitted to `pool` (the caller's scheduler lane) when given, else to the hedge pool."""
+    stats = {} if stats is None else stats
+    start = time.perf_counter()
+    key = cache_key(LLM_MODEL, section, maxTokens, prompt)
+    if useCache and LLM_CACHE_ENABLED:
+        cached = _cache.get(key)
+        if cached is not None:
+            if onDelta:
+                onDelta(cached)
+            stats.update(cached=True, attempts=0)
+            recordCall(section, stats, time.perf_counter() - start)
+            return cached
+
+    stats["cached"] = False
+    if hedge is not None:
+        text = hedgedFetch(prompt, onDelta, timeout, maxTokens, stats, section, hedge, pool)
+    else:
+        text = fetchLLMResponse(prompt, onDelta, timeout, maxTokens, stats)
+    if LLM_CACHE_ENABLED and text:
+        _cache.set(key, text)
+    seconds = time.perf_counter() - start
+    # hedge delays are picked from provider time only: waiting on our own semaphore or
+    # pools says nothing about a slow provider
+    _latencies.record(section, stats.get("provider_seconds", seconds))
+    recordCall(section, stats, seconds)
+    return text
+
+
+def recordCall(section, stats, seconds):
+    stats["seconds"] = seconds
+    label = section or "none"
+    metrics.LLM_CALL_SECONDS.observe(seconds, section=label, cached=str(stats["cached"]).lower())
+    if "ttft" in stats:
+        metrics.LLM_TTFT_SECONDS.observe(stats["ttft"], section=label)
+    for kind in ("prompt", "completion"):
+        if f"{kind}_tokens" in stats:
+            metrics.LLM_TOKENS.inc(stats[f"{kind}_tokens"], section=label, kind=kind)
+
+
+def fetchLLMResponse(prompt, onDelta=None, timeout=None, maxTokens=None, stats=None, handle=None):
+    emitted = False
+
+    def trackDelta(chunk):
+        nonlocal emitted
+        emitted = True
+        onDelta(chunk)
+
+    attempt = 0
+    while True:
+        if handle is not None and handle.cancelled:
+            return ""
+        try:
+            if stats is not None:
+                stats["attempts"] = attempt + 1
+            with _semaphore:
+                if handle is not None:
+                    handle.started.set()
+                start = time.perf_counter()
+                text = streamCompletion(prompt, trackDelta if onDelta else None, timeout, maxTokens, stats, handle)
+                if stats is not None:
+                    stats["provider_seconds"] = time.perf_counter() - start
+                return text
+        except RETRYABLE_ERRORS as e:
+            if handle is not None and handle.cancelled:
+                return ""
+            if attempt >= LLM_MAX_RETRIES:
+                raise
+            delay = backoffDelay(attempt, e)
+            if handle is None:
+                time.sleep(delay)
+            elif handle.sleep(delay):
+                return ""
+            attempt += 1
+            if emitted:
+                emitted = False
+                onDelta(None)
+
+
+def getHedgePool():
+    global _hedgePool
+    with _clientLock:
+        if _hedgePool is None:
+            _hedgePool = ThreadPoolExecutor(max_workers=2 * LLM_MAX_CONNECTIONS, thread_name_prefix="paperforge-hedge")
+        return _hedgePool
+
+
+def hedgeBudget():
+    """A fresh per-paper hedge budget, or None when hedging is off"""
+    return HedgeBudget(LLM_HEDGE_BUDGET) if LLM_HEDGE_ENABLED else None
+
+
+def hedgedFetch(prompt, onDelta, timeout, maxTokens, stats, section, budget, hedgePool=None):
+    """fetchLLMResponse, plus a duplicate request if the call outlives the section's recent
+    LLM_HEDGE_PERCENTILE latency. The first successful response wins and the other is cancelled;
+    the primary's deltas stream live, and are replaced (onDelta(None) + text) if the hedge wins."""
+    delay = _latencies.percentile(section, LLM_HEDGE_PERCENTILE)
+    if delay is None:
+        return fetchLLMResponse(prompt, onDelta, timeout, maxTokens, stats)
+    delay = max(delay, LLM_HEDGE_MIN_DELAY)
+
+    lock = threading.Lock()
+    finished = queue.Queue()
+    primary, hedge = CallHandle(), CallHandle()
+    callStats = {primary: {}, hedge: {}}
+    winner = None
+    primaryEmitted = False
+
+    def primaryDelta(chunk):
+        nonlocal primaryEmitted
+        with lock:
+            if winner is None or winner is primary:
+                primaryEmitted = True
+                onDelta(chunk)
+
+    def run(handle, deltaFn):
+        try:
+            finished.put((handle, fetchLLMResponse(prompt, deltaFn, timeout, maxTokens, callStats[handle], handle), None))
+        except Exception as e:
+            finished.put((handle, None, e))
+        finally:
+            handle.started.set()
+
+    pool = getHedgePool()
+    pool.submit(run, primary, primaryDelta if onDelta else None)
+    pending = 1
+    fired = False
+    # the hedge delay counts from when the primary holds a connection slot, so a
+    # busy process (hedge pool queue, _semaphore) does not make every call hedge
+    primary.started.wait()
+    try:
+        handle, text, error = finished.get(timeout=delay)
+    except queue.Empty:
+        if budget.take():
+            fired = True
+            metrics.LLM_HEDGES.inc(outcome="fired")
+            # the duplicate is extra provider load: it queues and is rate limited in the
+            # caller's lane like any other call, the primary already holds its turn
+            (hedgePool or pool).submit(run, hedge, None)
+            pending += 1
+        else:
+            metrics.LLM_HEDGES.inc(outcome="no_budget")
+        handle, text, error = finished.get()
+    pending -= 1
+    while error is not None and pending:
+        # the first call failed outright; the other one may still succeed
+        handle, text, error = finished.get()
+        pending -= 1
+
+    with lock:
+        winner = handle
+        (hedge if handle is primary else primary).cancel()
+        if error is None and handle is hedge and onDelta:
+            if primaryEmitted:
+                onDelta(None)
+            onDelta(text)
+
+    if fired:
+        metrics.LLM_HEDGES.inc(outcome="won" if handle is hedge else "lost")
+    stats.update(callStats[handle])
+    stats["hedged"] = fired
+    if error is not None:
+        raise error
+    return text
+
+
+def buildPrompts(prompt, plan=None):
+    prompts = {}
+    prompts['Title'] = prompt + "\n\nNow, I want you to generate a normal one line of small TITLE based on the overview given to you."
+
+    for i in range(len(SECTIONS)):
+        if plan:
+            section = plan[SECTIONS[i]]
+            prompts[SECTIONS[i]] = prompt + f"\n\nI want you to generate {section['paragraphs']} paragraphs on the {SECTIONS[i]} section of the research paper, about {section['words']} words in total, make sure you generate detailed content."
+        else:
+            prompts[SECTIONS[i]] = prompt + f"\n\nI want you to generate {SECTION_PARAS[i]} paragraphs on the {SECTIONS[i]} section of the research paper, make sure you generate detailed content."
+
+    prompts['References'] = prompt + referencesInstruction(plan)
+    return prompts
+
+
+def referencesInstruction(plan=None):
+    count = f"{plan['References']['count']} " if plan else "some "
+    return f"\n\nNow, I want you to generate a {count}References for the research paper based on the content generated above. Make sure the references are in IEEE format. And the references that you give must be in points, they must not in paragraphs."
+
+
+def referencesPrompt(prompt, text, plan=None):
+    body = "\n\n".join(f"{name}:\n{text[name][:REFERENCES_EXCERPT_CHARS].strip()}" for name in SECTIONS if name in text)
+    return prompt + "\n\nHere is the start of each section generated for the research paper:\n\n" + body + referencesInstruction(plan)
+
+
+def generateSections(prompt, prompts, results, concurrency=None, onDelta=None, onSection=None, plan=None, onStats=None, hedge=None, useCache=True, pool=None):
+    """Generate every entry of `prompts` that is not already in `results`, one call per section.
+    Calls run on `pool` (anything with an Executor-style submit) when given, else on a pool
+    of `concurrency` threads owned by this paper; a given `pool` also takes their hedge requests."""
+    concurrency = LLM_CONCURRENCY if concurrency is None else concurrency
+    lane = pool
+    order = list(prompts.keys())
+    todo = [name for name in order if name not in results]
+
+    def generate(name, llmPrompt):
+        sectionDelta = (lambda chunk: onDelta(name, chunk)) if onDelta else None
+        maxTokens = plan[name]["max_tokens"] if plan else None
+        stats = {}
+        response = getLLMResponse(llmPrompt, onDelta=sectionDelta, section=name, maxTokens=maxTokens, stats=stats, hedge=hedge, useCache=useCache, pool=lane)
+        if onStats:
+            onStats(name, stats)
+        if onSection:
+            onSection(name, response)
+        return response
+
+    if pool is None and concurrency <= 1:
+        for name in todo:
+            if name == 'References' and REFERENCES_USE_SECTIONS:
+                results[name] = generate(name, referencesPrompt(prompt, results, plan))
+            else:
+                results[name] = generate(name, prompts[name])
+    else:
+        ownPool = pool is None
+        if ownPool:
+            pool = ThreadPoolExecutor(max_workers=concurrency)
+        try:
+            deferRefs = REFERENCES_USE_SECTIONS
+            futures = {
+                name: pool.submit(generate, name, prompts[name])
+                for name in todo
+                if not (name == 'References' and deferRefs)
+            }
+            for name, future in futures.items():
+                results[name] = future.result()
+            if deferRefs and 'References' in todo:
+                results['References'] = pool.submit(generate, 'References', referencesPrompt(prompt, results, plan)).result()
+        finally:
+            if ownPool:
+                pool.shutdown()
+
+    # keep the original Title -> sections -> References order for generate_ieee_paper
+    text = {name: results[name] for name in order}
     return text
-    
-# sendRequest(' ')
\ No newline at end of file
+
+
+def sendRequest(prompt, concurrency=None, onDelta=None, onSection=None, plan=None, onStats=None, pool=None):
+    """Callbacks run on worker threads: onDelta(section, chunk) as text streams in
+    (chunk None = restart), onSection(section, text) as soon as a section is complete,
+    onStats(section, stats) with the call's timings and token counts just before it.
+    `plan` (services.planner.plan_paper) sets paragraph counts and max_tokens per section.
+    `pool` runs the section calls on a shared executor (e.g. a FairScheduler lane)."""
+    return generateSections(prompt, buildPrompts(prompt, plan), {}, concurrency, onDelta, onSection, plan, onStats, hedgeBudget(), pool=pool)
+
+
+def regenerateSections(prompt, sections, names, concurrency=None, onDelta=None, onSection=None, plan=None, onStats=None):
+    """Generate only `names` again, bypassing the cache; every other section keeps its text
+    from `sections`. Returns the full, ordered section map."""
+    kept = {name: text for name, text in sections.items() if name not in names}
+    return generateSections(
+        prompt, buildPrompts(prompt, plan), kept, concurrency, onDelta, onSection, plan, onStats,
+        hedgeBudget(), useCache=False,
+    )
+
+
+def structuredPrompt(prompt, plan=None):
+    keys = ['"Title": a normal one line of small title based on the overview']
+    for i in range(len(SECTIONS)):
+        if plan:
+            section = plan[SECTIONS[i]]
+            keys.append(f'"{SECTIONS[i]}": {section["paragraphs"]} paragraphs, about {section["words"]} words in total')
+        else:
+            keys.append(f'"{SECTIONS[i]}": {SECTION_PARAS[i]} paragraphs')
+    count = f"{plan['References']['count']} " if plan else "some "
+    keys.append(f'"References": {count}references in IEEE format, one reference per line')
+
+    return prompt + (
+        "\n\nNow, I want you to generate the complete research paper in one response. "
+        "Reply with a single JSON object and nothing else, with exactly these keys in this order, "
+        "every value a JSON string with paragraphs separated by a blank line:\n"
+        + "\n".join("- " + key for key in keys)
+        + "\nMake sure you generate detailed content."
+    )
+
+
+def sendRequestStructured(prompt, concurrency=None, onDelta=None, onSection=None, plan=None, onStats=None, pool=None):
+    """Single-call variant of sendRequest: the whole paper is requested as one JSON object,
+    so the overview is sent once. Sections are parsed out of the stream and reported through
+    the same callbacks as they complete; keys that are missing or malformed at the end are
+    re-requested one section at a time."""
+    prompts = buildPrompts(prompt, plan)
+    results = {}
+    started = set()
+    lock = threading.Lock()
+
+    def valueDelta(name, chunk):
+        if name in prompts and name not in results and onDelta:
+            started.add(name)
+            onDelta(name, chunk)
+
+    def valueDone(name, text):
+        with lock:
+            if name not in prompts or name in results:
+                return
+            results[name] = text
+        if onSection:
+            onSection(name, text)
+
+    parser = StreamingObjectParser(valueDelta, valueDone)
+
+    def feed(chunk):
+        nonlocal parser
+        if chunk is None:
+            # a retry restarts the object; sections that already completed are kept
+            for name in started - results.keys():
+                onDelta(name, None)
+            started.clear()
+            parser = StreamingObjectParser(valueDelta, valueDone)
+        else:
+            parser.feed(chunk)
+
+    maxTokens = None
+    if plan:
+        maxTokens = sum(section["max_tokens"] for section in plan.values()) + STRUCTURED_OVERHEAD_TOKENS
+    # the whole-paper call is never hedged: a duplicate would double the cost of the paper
+    stats = {}
+    call = functools.partial(getLLMResponse, structuredPrompt(prompt, plan), onDelta=feed, section="Paper", maxTokens=maxTokens, stats=stats)
+    if pool is not None:
+        pool.submit(call).result()
+    else:
+        call()
+    if onStats:
+        onStats("Paper", stats)
+
+    # anything the single call left out is filled in with per-section calls
+    for name in started - results.keys():
+        onDelta(name, None)
+    return generateSections(prompt, prompts, results, concurrency, onDelta, onSection, plan, onStats, hedgeBudget(), pool=pool)
+
+
+# generation strategy per Schema.mode
+GENERATORS = {
+    "sections": sendRequest,
+    "single": sendRequestStructured,
+}
+
+# sendRequest(' ')
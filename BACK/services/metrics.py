@@ -0,0 +1,147 @@
+import math
+import threading
+
+# Prometheus text exposition format, kept dependency-free
+
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60, 120, 300)
+SIZE_BUCKETS = (16e3, 32e3, 64e3, 128e3, 256e3, 512e3, 1e6, 2e6, 4e6)
+
+
+def format_labels(labels):
+    if not labels:
+        return ""
+    escaped = (str(v).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"') for v in labels.values())
+    return "{" + ",".join(f'{k}="{v}"' for k, v in zip(labels, escaped)) + "}"
+
+
+def format_value(value):
+    if value == math.inf:
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) and not value.is_integer() else str(int(value))
+
+
+class Metric:
+    kind = "untyped"
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+        REGISTRY.append(self)
+
+    def _key(self, labels):
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        with self._lock:
+            items = sorted(self._values.items())
+            for key, value in items:
+                lines.extend(self._samples(dict(zip(self.labelnames, key)), value))
+        return lines
+
+    def _samples(self, labels, value):
+        return [f"{self.name}{format_labels(labels)} {format_value(value)}"]
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        with self._lock:
+            return self._values.get(self._key(labels), 0)
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = {"counts": [0] * len(self.buckets), "sum": 0.0, "count": 0}
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state["counts"][i] += 1
+                    break
+            state["sum"] += value
+            state["count"] += 1
+
+    def count(self, **labels):
+        with self._lock:
+            state = self._values.get(self._key(labels))
+            return state["count"] if state else 0
+
+    def _samples(self, labels, state):
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self.buckets, state["counts"]):
+            cumulative += count
+            bucket = format_labels({**labels, "le": format_value(bound)})
+            lines.append(f"{self.name}_bucket{bucket} {cumulative}")
+        lines.append(f"{self.name}_sum{format_labels(labels)} {format_value(state['sum'])}")
+        lines.append(f"{self.name}_count{format_labels(labels)} {state['count']}")
+        return lines
+
+
+REGISTRY = []
+
+
+def render_metrics(extra=None, counters=None):
+    """All registered metrics, plus `extra` {prefix: stats dict}: keys listed in
+    `counters` {prefix: keys} only ever grow and are rendered as counters (with
+    a _total suffix), any other number as a gauge"""
+    lines = []
+    for metric in REGISTRY:
+        lines.extend(metric.render())
+    for prefix, stats in (extra or {}).items():
+        counter_keys = (counters or {}).get(prefix, ())
+        for key, value in stats.items():
+            if isinstance(value, (int, float)) and not isinstance(value, bool):
+                if key in counter_keys:
+                    name, kind = f"{prefix}_{key}_total", "counter"
+                else:
+                    name, kind = f"{prefix}_{key}", "gauge"
+                lines.append(f"# TYPE {name} {kind}")
+                lines.append(f"{name} {format_value(value)}")
+    return "\n".join(lines) + "\n"
+
+
+# --------------------------------------------------
+# Paper pipeline metrics
+# --------------------------------------------------
+STAGE_SECONDS = Histogram(
+    "paperforge_stage_seconds", "Wall time of each pipeline stage", ["stage"]
+)
+LLM_CALL_SECONDS = Histogram(
+    "paperforge_llm_call_seconds", "Wall time of one LLM call, retries included", ["section", "cached"]
+)
+LLM_TTFT_SECONDS = Histogram(
+    "paperforge_llm_ttft_seconds", "Time to the first streamed token of an LLM call", ["section"]
+)
+LLM_TOKENS = Counter(
+    "paperforge_llm_tokens_total", "Tokens reported by the provider", ["section", "kind"]
+)
+LLM_HEDGES = Counter(
+    "paperforge_llm_hedges_total", "Hedged LLM requests: fired, won, lost, or skipped for lack of budget", ["outcome"]
+)
+DOCX_RENDER_SECONDS = Histogram(
+    "paperforge_docx_render_seconds", "Time spent building and saving a DOCX"
+)
+DOCX_BYTES = Histogram(
+    "paperforge_docx_bytes", "Size of a rendered DOCX", buckets=SIZE_BUCKETS
+)
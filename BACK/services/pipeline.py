@@ -0,0 +1,193 @@
+import time
+import asyncio
+from utils.prompt import prompt_generator
+from services.llm import GENERATORS
+from services.ieeeFormat import generate_ieee_paper, prepare_section, warm_up
+from services.executors import run_io, run_cpu, IOStream
+from services.artifacts import artifacts
+from services.planner import plan_paper, estimate_pages
+from services.digest import needs_digest, digest_overview
+from services import metrics
+from services.admission import admission, Overloaded
+from utils.textclean import StreamCleaner
+
+PREVIEW_SEPARATOR = "\n\n"
+
+
+def paper_meta(prompt, sections, plan, mode):
+    """What an artifact keeps to regenerate single sections later (see /papers/{id}/regenerate)"""
+    return {"prompt": prompt, "sections": sections, "plan": plan, "mode": mode}
+
+
+async def warm_renderers():
+    """Start one render process and load python-docx in it before the first paper; the
+    pool starts the others only when renders overlap"""
+    await run_cpu(warm_up)
+
+
+async def render_docx(sections, clean=True):
+    """Render a paper in the process pool; returns (docx bytes, seconds).
+
+    DOCX metrics are recorded here: the worker process has its own registry.
+    """
+    start = time.perf_counter()
+    docx = await run_cpu(generate_ieee_paper, sections, clean=clean)
+    seconds = time.perf_counter() - start
+    metrics.DOCX_RENDER_SECONDS.observe(seconds)
+    metrics.DOCX_BYTES.observe(len(docx))
+    return docx, seconds
+
+
+def round_stats(stats):
+    """JSON-friendly view of an LLM call's stats (services.llm.getLLMResponse)"""
+    return {key: round(value, 3) if isinstance(value, float) else value for key, value in stats.items()}
+
+
+async def paper_events(data):
+    """Run the full paper pipeline, yielding (stage, status, data) progress events.
+
+    Every completed/error event carries the stage's wall time in `seconds`, and
+    the final event the whole run's `total_seconds`; all are also recorded in
+    the stage latency histogram served on /metrics.
+    """
+    start = time.perf_counter()
+    started = {}
+    async for stage, status, event_data in run_pipeline(data):
+        now = time.perf_counter()
+        if status == "started":
+            started[stage] = now
+        elif stage in started and status in ("completed", "error"):
+            seconds = now - started.pop(stage)
+            metrics.STAGE_SECONDS.observe(seconds, stage=stage)
+            event_data = {**event_data, "seconds": round(seconds, 3)}
+        elif stage == "complete":
+            metrics.STAGE_SECONDS.observe(now - start, stage="total")
+            event_data = {**event_data, "total_seconds": round(now - start, 3)}
+        yield stage, status, event_data
+
+
+async def admitted_paper_events(data, ticket=None):
+    """paper_events once `ticket` (services.admission) holds a slot, reporting the queue
+    position while it waits. Without a ticket one is reserved here, failing if the queue is full."""
+    if ticket is None:
+        try:
+            ticket = admission.reserve()
+        except Overloaded as e:
+            yield "error", "failed", {"message": str(e), "retry_after": e.retry_after}
+            return
+
+    ticket.claimed = True
+    try:
+        if not ticket.admitted:
+            start = time.perf_counter()
+            async for position in ticket.wait():
+                yield "queued", "waiting", {"position": position}
+            yield "queued", "completed", {"seconds": round(time.perf_counter() - start, 3)}
+
+        async for event in paper_events(data):
+            yield event
+    finally:
+        ticket.release()
+
+
+async def run_pipeline(data):
+    try:
+        # Stage 1: Validation
+        yield "validation", "started", {}
+        await asyncio.sleep(0.5)  # Simulate validation time
+
+        if len(data.overview.strip()) < 30:
+            yield "validation", "error", {"message": "Overview too short"}
+            return
+
+        yield "validation", "completed", {}
+
+        # Stage 2: Prompt Generation
+        yield "prompt_generation", "started", {}
+        prompt_result = prompt_generator(data.overview)
+
+        if prompt_result["status"] != "done":
+            yield "prompt_generation", "error", {"message": "Failed to generate prompt"}
+            return
+
+        yield "prompt_generation", "completed", {}
+
+        # Stage 2b: Digest - long overviews are condensed once so every section prompt stays small
+        if needs_digest(data.overview):
+            yield "digest", "started", {"overview_chars": len(data.overview)}
+            overview = await run_io(digest_overview, data.overview)
+            prompt_result = prompt_generator(overview)
+            yield "digest", "completed", {"overview_chars": len(data.overview), "digest_chars": len(overview)}
+        else:
+            yield "digest", "skipped", {"overview_chars": len(data.overview)}
+
+        # Stage 3: LLM Response
+        plan = plan_paper(data.npages)
+        yield "llm_response", "started", {
+            "mode": data.mode,
+            "plan": {name: section["paragraphs"] for name, section in plan.items() if "paragraphs" in section}
+        }
+
+        # sections are cleaned as they land, overlapping with the slower calls; the
+        # document itself is built in the process pool once they are all in
+        texts = {}
+        prepared = {}
+        call_stats = {}
+        # previews go through the same cleaner as the document, so echoed headings never show up;
+        # lines are sent as Markdown paragraphs, where a single newline would fold them into one
+        cleaners = {}
+
+        def on_section(section, text):
+            texts[section] = text
+            prepared[section] = prepare_section(section, text)
+            stream.emit("section", section, None)
+
+        stream = IOStream()
+        async for kind, section, chunk in stream.run(
+            GENERATORS[data.mode],
+            prompt_result["prompt"],
+            onDelta=lambda section, chunk: stream.emit("delta", section, chunk),
+            onSection=on_section,
+            plan=plan,
+            onStats=call_stats.__setitem__,
+        ):
+            if kind == "section":
+                rest = cleaners.pop(section, StreamCleaner(PREVIEW_SEPARATOR)).close()
+                if rest:
+                    yield "llm_response", "section_delta", {"section": section, "chunk": rest}
+                yield "llm_response", "section_completed", {
+                    "section": section,
+                    **round_stats(call_stats.get(section, {})),
+                }
+            elif chunk is None:
+                # a retried call starts the section over
+                cleaners.pop(section, None)
+                yield "llm_response", "section_delta", {"section": section, "chunk": "", "reset": True}
+            else:
+                chunk = cleaners.setdefault(section, StreamCleaner(PREVIEW_SEPARATOR)).feed(chunk)
+                if chunk:
+                    yield "llm_response", "section_delta", {"section": section, "chunk": chunk}
+        yield "llm_response", "completed", {
+            "calls": len(call_stats),
+            "prompt_tokens": sum(stats.get("prompt_tokens", 0) for stats in call_stats.values()),
+            "completion_tokens": sum(stats.get("completion_tokens", 0) for stats in call_stats.values()),
+        }
+
+        # Stage 4: Document Generation
+        yield "document_generation", "started", {}
+        # in the generator's section order, which sets the numbering
+        docx, render_seconds = await render_docx(
+            {name: prepared[name] for name in stream.result if name in prepared}, clean=False
+        )
+        paper_id = artifacts.put(docx, meta=paper_meta(prompt_result["prompt"], stream.result, plan, data.mode))
+        yield "document_generation", "completed", {
+            "estimated_pages": round(estimate_pages(texts), 1),
+            "render_seconds": round(render_seconds, 3),
+            "docx_bytes": len(docx),
+        }
+
+        # Final success message
+        yield "complete", "success", {"paper_id": paper_id, "url": f"/papers/{paper_id}"}
+
+    except Exception as e:
+        yield "error", "failed", {"message": str(e)}
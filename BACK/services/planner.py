@@ -0,0 +1,146 @@
+import math
+
+# --------------------------------------------------
+# Page geometry, mirrors the layout in ieeeFormat.py:
+# A4, 0.5in margins, two columns 0.5in apart, Times New Roman
+# --------------------------------------------------
+POINTS_PER_INCH = 72
+PAGE_WIDTH = 8.27 * POINTS_PER_INCH
+PAGE_HEIGHT = 11.69 * POINTS_PER_INCH
+MARGIN = 0.5 * POINTS_PER_INCH
+COLUMN_GAP = 0.5 * POINTS_PER_INCH
+COLUMN_WIDTH = (PAGE_WIDTH - 2 * MARGIN - COLUMN_GAP) / 2
+COLUMN_HEIGHT = PAGE_HEIGHT - 2 * MARGIN
+
+# Times New Roman averages ~0.45em per character (spaces included); single
+# spacing is ~1.15x the font size
+AVG_CHAR_EM = 0.45
+LINE_HEIGHT_EM = 1.15
+SPACE_AFTER = 2.6
+
+BODY_PT = 9
+HEADING_PT = 10
+TITLE_PT = 22
+SPACER_PT = 11   # empty Normal paragraph after each numbered section
+
+CHARS_PER_WORD = 6      # including the trailing space
+TOKENS_PER_WORD = 1.33
+TOKEN_SLACK = 1.15      # headroom so a section is not cut mid-sentence
+
+# Relative share of the body each section gets (the old fixed paragraph counts)
+SECTION_WEIGHTS = {
+    "Abstract": 1,
+    "Introduction": 5,
+    "Literature Review": 7,
+    "Methodology": 8,
+    "Results": 7,
+}
+
+WORDS_PER_PARAGRAPH = 110
+ABSTRACT_MAX_WORDS = 250
+# Output cap for one section call; words a section cannot take go to the others
+SECTION_MAX_TOKENS = 12000
+TITLE_MAX_TOKENS = 40
+TOKENS_PER_REFERENCE = 50
+REFERENCE_LINES = 2.5   # an IEEE reference wraps to 2-3 body lines
+
+
+def chars_per_line(size, width=COLUMN_WIDTH):
+    return max(1, int(width / (size * AVG_CHAR_EM)))
+
+
+def lines_per_column(size=BODY_PT):
+    return COLUMN_HEIGHT / (size * LINE_HEIGHT_EM)
+
+
+def paragraph_height(text, size=BODY_PT, width=COLUMN_WIDTH):
+    """Height in points of one paragraph; every explicit line break starts a new line"""
+    per_line = chars_per_line(size, width)
+    lines = sum(max(1, math.ceil(len(line) / per_line)) for line in text.split("\n"))
+    return lines * size * LINE_HEIGHT_EM + SPACE_AFTER
+
+
+def estimate_pages(paper: dict):
+    """Page count of a rendered paper, estimated from text length alone (no DOCX rendering)"""
+    # the title spans both columns, so it uses its height in each
+    used = 2 * paragraph_height(paper.get("Title", ""), TITLE_PT, PAGE_WIDTH - 2 * MARGIN)
+
+    excluded = {"Title", "References", "output_file"}
+    for key, text in paper.items():
+        if key in excluded:
+            continue
+        used += paragraph_height(key, HEADING_PT)
+        used += paragraph_height(text)
+        if key != "Abstract":
+            used += SPACER_PT * LINE_HEIGHT_EM
+
+    if "References" in paper:
+        used += paragraph_height("References", HEADING_PT)
+        refs = paper["References"]
+        for ref in (refs.split("\n\n") if isinstance(refs, str) else refs):
+            used += paragraph_height(ref)
+
+    return used / (2 * COLUMN_HEIGHT)
+
+
+def share_words(total, caps):
+    """Split `total` words by SECTION_WEIGHTS; what a section cannot take under its cap goes to the rest"""
+    shares = {}
+    left = dict(SECTION_WEIGHTS)
+    while left:
+        weight = sum(left.values())
+        capped = [name for name, w in left.items() if total * w / weight > caps[name]]
+        if not capped:
+            shares.update((name, total * w / weight) for name, w in left.items())
+            break
+        for name in capped:
+            shares[name] = caps[name]
+            total -= caps[name]
+            del left[name]
+    return shares
+
+
+def plan_paper(npages: int):
+    """Per-section paragraph counts and max_tokens budgets that fill `npages` pages.
+
+    Returns {section: {"paragraphs", "words", "max_tokens"}} for the body sections,
+    plus "Title" and "References" entries ({"max_tokens"} / {"count", "max_tokens"}).
+
+    Cost is linear in `npages`: about 1.4k body words (2.3k max_tokens) per page.
+    The old fixed prompts (28 paragraphs, ~3k words) filled only about 2 pages of
+    this layout whatever was asked, so any plan above 2 pages requests more output
+    than they did; what is saved are the tokens past the page target.
+    """
+    npages = max(1, npages)
+    body_line = BODY_PT * LINE_HEIGHT_EM
+    total_lines = npages * 2 * COLUMN_HEIGHT / body_line
+
+    # fixed overhead: title, headings, spacers and the reference list
+    references = min(30, max(6, 2 * npages))
+    overhead = 2 * paragraph_height("x" * 60, TITLE_PT, PAGE_WIDTH - 2 * MARGIN)
+    overhead += (len(SECTION_WEIGHTS) + 1) * (HEADING_PT * LINE_HEIGHT_EM + SPACE_AFTER)
+    overhead += (len(SECTION_WEIGHTS) - 1) * SPACER_PT * LINE_HEIGHT_EM
+    overhead += references * (REFERENCE_LINES * body_line + SPACE_AFTER)
+    body_lines = max(total_lines - overhead / body_line, 0)
+
+    words_per_line = chars_per_line(BODY_PT) / CHARS_PER_WORD
+    section_max_words = SECTION_MAX_TOKENS / (TOKENS_PER_WORD * TOKEN_SLACK)
+    caps = {name: section_max_words for name in SECTION_WEIGHTS}
+    caps["Abstract"] = ABSTRACT_MAX_WORDS
+    shares = share_words(body_lines * words_per_line, caps)
+
+    plan = {"Title": {"max_tokens": TITLE_MAX_TOKENS}}
+    for name in SECTION_WEIGHTS:
+        words = max(int(shares[name]), 40)
+        paragraphs = 1 if name == "Abstract" else max(1, round(words / WORDS_PER_PARAGRAPH))
+        plan[name] = {
+            "paragraphs": paragraphs,
+            "words": words,
+            "max_tokens": math.ceil(words * TOKENS_PER_WORD * TOKEN_SLACK),
+        }
+
+    plan["References"] = {
+        "count": references,
+        "max_tokens": references * TOKENS_PER_REFERENCE,
+    }
+    return plan
@@ -0,0 +1,103 @@
+import asyncio
+import hashlib
+import json
+
+
+def request_key(data):
+    """Identity of a paper request: whitespace-normalized overview, format, npages and mode"""
+    payload = json.dumps([
+        " ".join(data.overview.split()),
+        data.format.strip().lower(),
+        data.npages,
+        data.mode,
+    ])
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class Flight:
+    """One running generation: the events it has produced so far, shared by every subscriber"""
+
+    def __init__(self):
+        self.events = []
+        self.done = False
+        self.subscribers = 0
+        self.task = None
+        self._changed = asyncio.Event()
+
+    def publish(self, event):
+        self.events.append(event)
+        self._notify()
+
+    def finish(self):
+        self.done = True
+        self._notify()
+
+    def _notify(self):
+        changed, self._changed = self._changed, asyncio.Event()
+        changed.set()
+
+    async def follow(self):
+        index = 0
+        while True:
+            while index < len(self.events):
+                yield self.events[index]
+                index += 1
+            if self.done:
+                return
+            await self._changed.wait()
+
+
+class SingleFlight:
+    """Deduplicates identical in-flight requests.
+
+    The first caller for a key starts the event source in a background task;
+    later callers attach to it, replay the events published so far and then
+    follow it live. The task is cancelled if every subscriber disconnects.
+    """
+
+    def __init__(self):
+        self._flights = {}
+        self.started = 0
+        self.coalesced = 0
+
+    def __contains__(self, key):
+        return key in self._flights
+
+    async def run(self, key, source):
+        """Yield the events of `source()` (an async iterator), shared by every caller with `key`"""
+        flight = self._flights.get(key)
+        if flight is None:
+            flight = Flight()
+            flight.task = asyncio.create_task(self._drive(key, flight, source))
+            self._flights[key] = flight
+            self.started += 1
+        else:
+            self.coalesced += 1
+
+        flight.subscribers += 1
+        try:
+            async for event in flight.follow():
+                yield event
+        finally:
+            flight.subscribers -= 1
+            if flight.subscribers == 0 and not flight.done:
+                flight.task.cancel()
+
+    async def _drive(self, key, flight, source):
+        try:
+            async for event in source():
+                flight.publish(event)
+        finally:
+            if self._flights.get(key) is flight:
+                del self._flights[key]
+            flight.finish()
+
+    def stats(self):
+        return {
+            "in_flight": len(self._flights),
+            "started": self.started,
+            "coalesced": self.coalesced,
+        }
+
+
+flights = SingleFlight()
@@ -0,0 +1,48 @@
+import asyncio
+
+import pytest
+
+from services.admission import AdmissionController, Overloaded
+
+
+def test_reserve_admits_queues_then_rejects():
+    controller = AdmissionController(limit=2, queue_size=1)
+    first, second = controller.reserve(), controller.reserve()
+    waiting = controller.reserve()
+
+    assert first.admitted and second.admitted
+    assert not waiting.admitted and waiting.position == 1
+
+    with pytest.raises(Overloaded) as excinfo:
+        controller.reserve()
+    assert excinfo.value.retry_after >= 1
+    assert controller.stats()["rejected"] == 1
+
+    first.release()
+    first.release()  # idempotent
+    assert waiting.admitted
+    assert controller.stats()["active"] == 2
+
+
+def test_waiting_ticket_reports_positions_until_admitted():
+    async def main():
+        controller = AdmissionController(limit=1, queue_size=5)
+        running = controller.reserve()
+        ahead, ticket = controller.reserve(), controller.reserve()
+        positions = []
+
+        async def wait():
+            async for position in ticket.wait():
+                positions.append(position)
+
+        waiter = asyncio.create_task(wait())
+        await asyncio.sleep(0)
+        ahead.release()  # leaves the queue
+        await asyncio.sleep(0)
+        running.release()
+        await asyncio.wait_for(waiter, 1)
+        return positions, ticket
+
+    positions, ticket = asyncio.run(main())
+    assert positions == [2, 1]
+    assert ticket.admitted
@@ -0,0 +1,135 @@
+import json
+import asyncio
+
+from fastapi.testclient import TestClient
+
+import main
+from services.admission import admission
+from services.artifacts import artifacts, DOCX_MIME
+from services.executors import shutdown_pools
+from services.pipeline import paper_meta
+from services.planner import plan_paper
+
+OVERVIEW = "A browser extension that detects phishing pages in real time with a boosted classifier."
+
+
+def sse_events(response):
+    return [json.loads(line[len("data: "):]) for line in response.iter_lines() if line.startswith("data: ")]
+
+
+def post_asgi(path, payload, send):
+    """Drive one POST through the ASGI app directly, with a caller-supplied `send`"""
+    messages = [{"type": "http.request", "body": json.dumps(payload).encode(), "more_body": False}]
+
+    async def receive():
+        if messages:
+            return messages.pop(0)
+        return {"type": "http.disconnect"}
+
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "POST",
+        "scheme": "http", "path": path, "raw_path": path.encode(), "query_string": b"", "root_path": "",
+        "headers": [(b"content-type", b"application/json")], "client": ("test", 1), "server": ("test", 80),
+    }
+    return main.app(scope, receive, send)
+
+
+def test_stream_slot_is_released_when_the_client_is_gone_before_the_first_byte(fakeLLM):
+    fakeLLM(text="unused")
+    before = admission.active
+
+    async def gone(message):
+        raise OSError("client disconnected")
+
+    async def disconnect_three_times():
+        for i in range(3):
+            try:
+                await post_asgi("/generate-docs-stream", {"overview": f"{OVERVIEW} {i}", "format": "IEEE", "npages": 4}, gone)
+            except OSError:
+                pass
+
+    asyncio.run(disconnect_three_times())
+    assert admission.active == before
+    assert admission.stats()["queued"] == 0
+
+
+def test_metrics_export_moving_averages_as_gauges():
+    body = TestClient(main.app).get("/metrics").text
+
+    assert "# TYPE paperforge_admission_paper_seconds gauge" in body
+    assert "# TYPE paperforge_admission_admitted_total counter" in body
+    assert "paper_seconds_total" not in body
+
+
+def test_stream_sends_cleaned_section_deltas_before_each_section_completes(fakeLLM):
+    fakeLLM(text="Introduction\n\nFirst paragraph of the section.\nSecond paragraph of the section.", tokenDelay=0.001)
+    payload = {"overview": f"{OVERVIEW} Streamed.", "format": "IEEE", "npages": 4}
+
+    try:
+        with TestClient(main.app).stream("POST", "/generate-docs-stream", json=payload) as response:
+            assert response.headers["content-type"].startswith("text/event-stream")
+            events = sse_events(response)
+    finally:
+        shutdown_pools()
+
+    previews, completed = {}, []
+    for event in events:
+        if event["status"] == "section_delta":
+            assert event["data"]["section"] not in completed
+            previews[event["data"]["section"]] = previews.get(event["data"]["section"], "") + event["data"]["chunk"]
+        elif event["status"] == "section_completed":
+            completed.append(event["data"]["section"])
+
+    assert len(completed) == 7 and set(previews) == set(completed)
+    assert set(previews.values()) == {"First paragraph of the section.\n\nSecond paragraph of the section."}
+    assert events[-1]["stage"] == "complete" and events[-1]["data"]["url"].startswith("/papers/")
+
+
+def test_paper_is_streamed_until_it_expires(monkeypatch):
+    data = bytes(range(256)) * 1024  # spans several 64 KiB chunks
+    paper_id = artifacts.put(data)
+    client = TestClient(main.app)
+
+    response = client.get(f"/papers/{paper_id}")
+    assert response.status_code == 200
+    assert response.content == data
+    assert response.headers["content-type"] == DOCX_MIME
+    assert response.headers["content-length"] == str(len(data))
+    assert 'filename="paper.docx"' in response.headers["content-disposition"]
+
+    monkeypatch.setattr(artifacts, "ttl", -1)
+    assert client.get(f"/papers/{paper_id}").status_code == 404
+    assert client.get("/papers/unknown").status_code == 404
+
+
+def test_regenerate_rejects_missing_papers_and_unknown_sections():
+    client = TestClient(main.app)
+    bare = artifacts.put(b"docx")
+    stored = artifacts.put(b"docx", meta=paper_meta("prompt", {"Title": "T", "Abstract": "A"}, None, "normal"))
+
+    assert client.post("/papers/unknown/regenerate", json={"sections": ["Abstract"]}).status_code == 404
+    assert client.post(f"/papers/{bare}/regenerate", json={"sections": ["Abstract"]}).status_code == 409
+    response = client.post(f"/papers/{stored}/regenerate", json={"sections": ["Abstract", "Appendix"]})
+    assert response.status_code == 400 and "Appendix" in response.json()["detail"]
+    assert client.post(f"/papers/{stored}/regenerate", json={"sections": []}).status_code == 422
+
+
+def test_regenerate_requests_only_the_named_section(fakeLLM):
+    server = fakeLLM(text="New text.")
+    plan = plan_paper(4)
+    sections = {name: f"Old {name} text." for name in ["Title", "Abstract", "Introduction", "Literature Review",
+                                                       "Methodology", "Results", "References"]}
+    paper_id = artifacts.put(b"docx", meta=paper_meta("prompt", sections, plan, "normal"))
+
+    try:
+        response = TestClient(main.app).post(f"/papers/{paper_id}/regenerate", json={"sections": ["Introduction"]})
+    finally:
+        shutdown_pools()
+
+    assert response.status_code == 200
+    assert len(server.requests) == 1
+    new = artifacts.get(response.json()["paper_id"])
+    assert new.meta["parent"] == paper_id
+    assert new.meta["sections"]["Introduction"] == "New text."
+    assert new.meta["sections"]["Abstract"] == "Old Abstract text."
+    assert artifacts.get(paper_id).data == b"docx"
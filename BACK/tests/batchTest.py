@@ -0,0 +1,106 @@
+import asyncio
+import threading
+
+import pytest
+
+from services import batch
+from services import executors
+from services.executors import FairScheduler, shutdown_pools
+from utils.schema import Schema
+
+
+def test_scheduler_takes_turns_between_lanes():
+    scheduler = FairScheduler(workers=1)
+    gate = threading.Event()
+    order = []
+    try:
+        blocker = scheduler.submit("x", gate.wait)
+        futures = [scheduler.submit("a", order.append, f"a{i}") for i in range(3)]
+        futures += [scheduler.lane("b").submit(order.append, f"b{i}") for i in range(3)]
+        gate.set()
+        for future in [blocker] + futures:
+            future.result(timeout=5)
+    finally:
+        scheduler.shutdown()
+
+    assert order == ["a0", "b0", "a1", "b1", "a2", "b2"]
+
+
+def test_scheduler_reports_call_errors():
+    scheduler = FairScheduler(workers=1)
+    try:
+        future = scheduler.submit("a", lambda: 1 / 0)
+        with pytest.raises(ZeroDivisionError):
+            future.result(timeout=5)
+    finally:
+        scheduler.shutdown()
+
+
+def test_failed_paper_does_not_abort_the_batch(fakeLLM, monkeypatch):
+    fakeLLM(text="section text")
+    digest = batch.digest_overview
+
+    def failing_digest(overview, pool=None):
+        if "broken" in overview:
+            raise RuntimeError("digest failed")
+        return digest(overview, pool)
+
+    monkeypatch.setattr(batch, "digest_overview", failing_digest)
+    papers = [
+        Schema(overview=f"A browser extension for phishing detection, {name}.", format="IEEE", npages=4)
+        for name in ("first", "broken", "third")
+    ]
+
+    async def collect():
+        return [event async for event in batch.batch_events(papers)]
+
+    try:
+        events = asyncio.run(collect())
+    finally:
+        shutdown_pools()
+
+    results = {data["index"]: status for stage, status, data in events if stage == "paper"}
+    assert results == {0: "completed", 1: "failed", 2: "completed"}
+    assert events[-1][:2] == ("batch", "completed")
+    assert events[-1][2]["succeeded"] == 2 and events[-1][2]["failed"] == 1
+
+
+def test_batch_papers_share_one_limit_and_stay_off_the_io_pool(fakeLLM, monkeypatch):
+    fakeLLM(text="section text")
+    monkeypatch.setattr(executors, "BATCH_PAPER_CONCURRENCY", 1)
+    write = batch.write_batch_paper
+    lock = threading.Lock()
+    active = peak = 0
+
+    def counting_write(data, lane):
+        nonlocal active, peak
+        with lock:
+            active += 1
+            peak = max(peak, active)
+        try:
+            return write(data, lane)
+        finally:
+            with lock:
+                active -= 1
+
+    monkeypatch.setattr(batch, "write_batch_paper", counting_write)
+    papers = [
+        Schema(overview=f"A browser extension for phishing detection, paper {i}.", format="IEEE", npages=4)
+        for i in range(2)
+    ]
+
+    async def collect():
+        return [event async for event in batch.batch_events(papers)]
+
+    async def two_batches():
+        return await asyncio.gather(collect(), collect())
+
+    shutdown_pools()
+    try:
+        results = asyncio.run(two_batches())
+        assert executors._io_pool is None
+    finally:
+        shutdown_pools()
+
+    assert all(events[-1][2]["succeeded"] == 2 for events in results)
+    assert peak == 1
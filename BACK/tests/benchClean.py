@@ -0,0 +1,87 @@
+"""Text cleaning throughput on large sections.
+
+Compares the previous clean_text (per-line re.match calls on the whole string)
+with utils.textclean, both on complete strings and fed as a token stream of
+small chunks, in MB/s of input.
+
+    cd BACK && python -m tests.benchClean
+"""
+
+import re
+import time
+import random
+import statistics
+
+from utils.textclean import StreamCleaner, clean_text
+
+VOCAB = "phishing detection model feature extension browser accuracy dataset real-time classifier " \
+        "evaluation precision recall network security system approach results method analysis".split()
+JUNK = ["Title: Real-Time Phishing Detection", "Methodology", "## III. Results:", "---", "**Introduction**"]
+
+
+def legacy_clean_text(text):
+    cleaned = []
+    for line in text.splitlines():
+        l = line.strip()
+        if not l:
+            continue
+        if re.match(r'^(abstract|introduction|methodology|results?|references?)$', l, re.I):
+            continue
+        if l.lower().startswith("title:"):
+            continue
+        if re.match(r'^[-_=]{3,}$', l):
+            continue
+        cleaned.append(line)
+    return "\n".join(cleaned).strip()
+
+
+def synthetic_section(words, seed=0):
+    rng = random.Random(seed)
+    paras = []
+    for i in range(max(1, words // 120)):
+        if i % 10 == 0:
+            paras.append(rng.choice(JUNK))
+        paras.append(" ".join(rng.choice(VOCAB) for _ in range(120)))
+    return "\n\n".join(paras)
+
+
+def chunks(text, seed=0):
+    # roughly token-sized pieces, like an LLM stream
+    rng = random.Random(seed)
+    out, i = [], 0
+    while i < len(text):
+        step = rng.randint(2, 8)
+        out.append(text[i:i + step])
+        i += step
+    return out
+
+
+def streamed(pieces):
+    cleaner = StreamCleaner()
+    return "".join([cleaner.feed(piece) for piece in pieces]) + cleaner.close()
+
+
+def throughput(fn, arg, size, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(arg)
+        times.append(time.perf_counter() - start)
+    return size / statistics.median(times) / 1e6
+
+
+def main(repeat=5):
+    print(f"{'words':>8} {'MB':>6} {'legacy MB/s':>12} {'clean MB/s':>11} {'stream MB/s':>12} {'speedup':>8}")
+    for words in (10_000, 100_000, 1_000_000):
+        text = synthetic_section(words)
+        pieces = chunks(text)
+        assert streamed(pieces) == clean_text(text)
+        size = len(text.encode())
+        legacy = throughput(legacy_clean_text, text, size, repeat)
+        whole = throughput(clean_text, text, size, repeat)
+        stream = throughput(streamed, pieces, size, repeat)
+        print(f"{words:>8} {size / 1e6:>6.2f} {legacy:>12.1f} {whole:>11.1f} {stream:>12.1f} {whole / legacy:>7.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,198 @@
+"""Offline end-to-end benchmark of /generate-docs-stream.
+
+Starts the fake OpenAI-compatible server and the FastAPI app (uvicorn, in
+process), then drives the streaming endpoint at increasing concurrency and
+reports, per level: papers per minute, p50/p95/p99 of every pipeline stage
+(from the `seconds` the SSE events carry) and of the client-side time to the
+first section delta and to completion, plus peak RSS of this process (fake
+server, app and clients together). The LLM cache is off and every overview
+is unique, so each paper does the full work.
+
+    cd BACK && python -m tests.benchE2E --levels 1,4,8,16 --latency realistic
+    cd BACK && python -m tests.benchE2E --save bench.json
+    cd BACK && python -m tests.benchE2E --baseline bench.json   # exit 1 on a regression
+"""
+
+import os
+import sys
+import math
+import json
+import time
+import uuid
+import socket
+import argparse
+import resource
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+from tests.fakeServer import FakeOpenAIServer, LATENCY_PROFILES, cannedText
+
+STAGES = ["queued", "validation", "prompt_generation", "digest", "llm_response", "document_generation"]
+OVERVIEW = (
+    "We built a browser extension that detects phishing pages in real time. It extracts URL, "
+    "DOM and certificate features on page load, scores them with a gradient boosted classifier "
+    "trained on 120k labelled pages, and warns the user before credentials are entered. "
+)
+
+
+def percentile(values, pct):
+    if not values:
+        return None
+    # nearest rank
+    values = sorted(values)
+    return values[max(0, math.ceil(pct / 100 * len(values)) - 1)]
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def peak_rss_mb():
+    # ru_maxrss is in KiB on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def start_app(llm_url):
+    os.environ.update({
+        "LLM_BASE_URL": llm_url,
+        "LLM_API_KEY": os.environ.get("LLM_API_KEY") or "bench-key",
+        "LLM_CACHE_ENABLED": "0",
+        "JOB_WORKERS": "0",
+        "JOBS_DB_PATH": os.path.join(tempfile.mkdtemp(), "jobs.sqlite"),
+    })
+    import uvicorn
+    import main
+
+    port = free_port()
+    server = uvicorn.Server(uvicorn.Config(main.app, host="127.0.0.1", port=port, log_level="warning"))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.05)
+    return server, thread, f"http://127.0.0.1:{port}"
+
+
+def run_paper(base_url, npages):
+    payload = {"overview": OVERVIEW + uuid.uuid4().hex, "format": "IEEE", "npages": npages}
+    start = time.perf_counter()
+    first_delta = None
+    stages = {}
+    ok = False
+    with requests.post(f"{base_url}/generate-docs-stream", json=payload, stream=True, timeout=600) as response:
+        if response.status_code != 200:
+            return {"ok": False, "status": response.status_code}
+        for line in response.iter_lines():
+            if not line.startswith(b"data: "):
+                continue
+            event = json.loads(line[6:])
+            stage, status, data = event["stage"], event["status"], event["data"]
+            if status == "section_delta" and first_delta is None:
+                first_delta = time.perf_counter() - start
+            elif status == "completed" and "seconds" in data:
+                stages[stage] = data["seconds"]
+            elif status == "success":
+                ok = True
+    return {
+        "ok": ok,
+        "total": time.perf_counter() - start,
+        "first_delta": first_delta,
+        "stages": stages,
+    }
+
+
+def run_level(base_url, concurrency, papers, npages):
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(lambda _: run_paper(base_url, npages), range(papers)))
+    wall = time.perf_counter() - start
+
+    done = [r for r in results if r["ok"]]
+    series = {stage: [r["stages"][stage] for r in done if stage in r["stages"]] for stage in STAGES}
+    series["first_delta"] = [r["first_delta"] for r in done if r["first_delta"] is not None]
+    series["total"] = [r["total"] for r in done]
+    return {
+        "concurrency": concurrency,
+        "papers": papers,
+        "succeeded": len(done),
+        "papers_per_minute": len(done) / wall * 60,
+        "peak_rss_mb": peak_rss_mb(),
+        "latency": {
+            name: {f"p{p}": percentile(values, p) for p in (50, 95, 99)}
+            for name, values in series.items() if values
+        },
+    }
+
+
+def print_level(result):
+    print(f"\n== concurrency {result['concurrency']}: {result['succeeded']}/{result['papers']} papers, "
+          f"{result['papers_per_minute']:.1f} papers/min, peak RSS {result['peak_rss_mb']:.0f} MB")
+    print(f"   {'stage':<20} {'p50 s':>8} {'p95 s':>8} {'p99 s':>8}")
+    for name, values in result["latency"].items():
+        print(f"   {name:<20} {values['p50']:>8.3f} {values['p95']:>8.3f} {values['p99']:>8.3f}")
+
+
+def compare(results, baseline, tolerance):
+    """Levels whose throughput dropped, or p95 total latency grew, by more than `tolerance`"""
+    regressions = []
+    previous = {level["concurrency"]: level for level in baseline}
+    for level in results:
+        before = previous.get(level["concurrency"])
+        if before is None:
+            continue
+        if level["papers_per_minute"] < before["papers_per_minute"] * (1 - tolerance):
+            regressions.append(f"concurrency {level['concurrency']}: papers/min "
+                               f"{before['papers_per_minute']:.1f} -> {level['papers_per_minute']:.1f}")
+        p95, old_p95 = level["latency"]["total"]["p95"], before["latency"]["total"]["p95"]
+        if p95 > old_p95 * (1 + tolerance):
+            regressions.append(f"concurrency {level['concurrency']}: total p95 {old_p95:.2f}s -> {p95:.2f}s")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--levels", default="1,2,4,8", help="comma-separated concurrency levels")
+    parser.add_argument("--papers-per-level", type=int, default=2, help="papers per level, times the concurrency")
+    parser.add_argument("--npages", type=int, default=4)
+    parser.add_argument("--latency", choices=sorted(LATENCY_PROFILES), default="fast")
+    parser.add_argument("--token-delay", type=float, default=0.0005, help="seconds per streamed word")
+    parser.add_argument("--save", help="write the results as JSON")
+    parser.add_argument("--baseline", help="compare with results saved by --save")
+    parser.add_argument("--tolerance", type=float, default=0.2)
+    args = parser.parse_args()
+
+    fake = FakeOpenAIServer(
+        text=cannedText(), latency=LATENCY_PROFILES[args.latency](), tokenDelay=args.token_delay
+    ).start()
+    server, thread, base_url = start_app(fake.baseUrl)
+    print(f"fake LLM at {fake.baseUrl} ({args.latency} latency), app at {base_url}")
+
+    results = []
+    try:
+        for concurrency in (int(level) for level in args.levels.split(",")):
+            result = run_level(base_url, concurrency, concurrency * args.papers_per_level, args.npages)
+            results.append(result)
+            print_level(result)
+    finally:
+        server.should_exit = True
+        thread.join()
+        fake.stop()
+
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump(results, f, indent=2)
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        for line in regressions:
+            print(f"REGRESSION {line}")
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
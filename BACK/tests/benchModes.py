@@ -0,0 +1,87 @@
+"""Generation mode benchmark: per-section calls vs one structured JSON call.
+
+Runs both modes against the fake OpenAI server for a long overview and reports
+requests, prompt/completion tokens (as counted by the fake server) and wall
+time. The server models prefill cost per prompt token and decode cost per word.
+
+    cd BACK && python -m tests.benchModes
+"""
+
+import json
+import re
+import time
+
+from services import llm
+from services.cache import LLMCache
+from services.planner import plan_paper
+from utils.prompt import prompt_generator
+from tests.fakeServer import FakeOpenAIServer
+
+OVERVIEW_WORDS = 800
+BASE_LATENCY = 0.15        # seconds before the first token
+PREFILL_PER_TOKEN = 0.0002  # seconds per prompt token
+DECODE_PER_WORD = 0.001    # seconds per streamed word
+
+
+def words(n):
+    return " ".join("lorem" for _ in range(n))
+
+
+def fake_text(plan):
+    def text(body):
+        prompt = body["messages"][0]["content"]
+        if "single JSON object" in prompt:
+            paper = {"Title": "A Fake Title"}
+            paper.update({name: words(plan[name]["words"]) for name in llm.SECTIONS})
+            paper["References"] = "\n".join(f"[{i}] Ref {i}" for i in range(1, plan["References"]["count"] + 1))
+            return json.dumps(paper)
+        match = re.search(r"on the (.+?) section", prompt)
+        if match:
+            return words(plan[match.group(1)]["words"])
+        if "References" in prompt[-400:]:
+            return "\n".join(f"[{i}] Ref {i}" for i in range(1, plan["References"]["count"] + 1))
+        return "A Fake Title"
+    return text
+
+
+def latency(body):
+    return BASE_LATENCY + sum(len(m["content"]) for m in body["messages"]) // 4 * PREFILL_PER_TOKEN
+
+
+def run(mode, prompt, plan, server):
+    llm._cache = LLMCache()
+    before = len(server.requests)
+    start = time.perf_counter()
+    llm.GENERATORS[mode](prompt, plan=plan)
+    elapsed = time.perf_counter() - start
+
+    bodies = server.requests[before:]
+    usage = [server.usage(body, server.text(body)) for body in bodies]
+    return {
+        "requests": len(bodies),
+        "prompt": sum(u["prompt_tokens"] for u in usage),
+        "completion": sum(u["completion_tokens"] for u in usage),
+        "seconds": elapsed,
+    }
+
+
+def main():
+    prompt = prompt_generator(words(OVERVIEW_WORDS))["prompt"]
+    print(f"{'pages':>5} {'mode':>9} {'requests':>8} {'prompt tok':>10} {'compl tok':>10} {'wall s':>7}")
+    for npages in (4, 8, 12):
+        plan = plan_paper(npages)
+        server = FakeOpenAIServer(text=fake_text(plan), latency=latency, tokenDelay=DECODE_PER_WORD).start()
+        llm.LLM_BASE_URL = server.baseUrl
+        llm.LLM_API_KEY = llm.LLM_API_KEY or "bench-key"
+        llm._client = None
+        try:
+            for mode in ("sections", "single"):
+                r = run(mode, prompt, plan, server)
+                print(f"{npages:>5} {mode:>9} {r['requests']:>8} {r['prompt']:>10} {r['completion']:>10} {r['seconds']:>7.2f}")
+        finally:
+            llm.getClient().close()
+            server.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""DOCX render benchmark: time and size of generate_ieee_paper for 4-20 page papers.
+
+Compares the style-based renderer against the previous approach of a fresh
+Document() with inline run/paragraph formatting.
+
+    cd BACK && python -m tests.benchRender
+"""
+
+import time
+import random
+import statistics
+from io import BytesIO
+
+from docx import Document
+from docx.shared import Pt, Inches
+from docx.enum.text import WD_ALIGN_PARAGRAPH
+
+from services.ieeeFormat import generate_ieee_paper, clean_text, add_continuous_section, set_two_columns, to_roman
+
+WORDS_PER_PAGE = 1300
+WEIGHTS = {"Abstract": 1, "Introduction": 5, "Literature Review": 7, "Methodology": 8, "Results": 7}
+VOCAB = "phishing detection model feature extension browser accuracy dataset real-time classifier " \
+        "evaluation precision recall network security system approach results method analysis".split()
+
+
+def synthetic_paper(npages, seed=0):
+    rng = random.Random(seed)
+    total = sum(WEIGHTS.values())
+    paper = {"Title": "Real-Time Phishing Detection with XGBoost"}
+    for name, weight in WEIGHTS.items():
+        words = npages * WORDS_PER_PAGE * weight // total
+        paras = [" ".join(rng.choice(VOCAB) for _ in range(120)) for _ in range(max(1, words // 120))]
+        paper[name] = "\n\n".join(paras)
+    paper["References"] = "\n\n".join(
+        f"[{i}] A. Author, \"Paper {i},\" Journal, vol. {i}, pp. 1-10, 2020." for i in range(1, 11)
+    )
+    return paper
+
+
+def inline_render(paper):
+    # the previous renderer: every run and paragraph carries its own formatting
+    def add(text, size, bold, alignment):
+        p = doc.add_paragraph()
+        run = p.add_run(text)
+        run.font.name = "Times New Roman"
+        run.font.size = Pt(size)
+        run.bold = bold
+        p.paragraph_format.alignment = alignment
+        p.paragraph_format.line_spacing = 1.0
+        p.paragraph_format.space_after = Pt(2.6)
+
+    doc = Document()
+    section = doc.sections[0]
+    section.page_width = Inches(8.27)
+    section.page_height = Inches(11.69)
+    for side in ("top_margin", "bottom_margin", "left_margin", "right_margin"):
+        setattr(section, side, Inches(0.5))
+    add(paper["Title"], 22, True, WD_ALIGN_PARAGRAPH.CENTER)
+    set_two_columns(add_continuous_section(doc))
+
+    add("Abstract", 10, True, WD_ALIGN_PARAGRAPH.CENTER)
+    add(clean_text(paper["Abstract"]), 9, True, WD_ALIGN_PARAGRAPH.JUSTIFY)
+    keys = [k for k in paper if k not in ("Title", "Abstract", "References")]
+    for idx, key in enumerate(keys, start=1):
+        add(f"{to_roman(idx)}. {key}", 10, True, WD_ALIGN_PARAGRAPH.CENTER)
+        add(clean_text(paper[key]), 9, False, WD_ALIGN_PARAGRAPH.JUSTIFY)
+        doc.add_paragraph("")
+    add("References", 10, True, WD_ALIGN_PARAGRAPH.CENTER)
+    for ref in paper["References"].split("\n\n"):
+        add(ref, 9, False, WD_ALIGN_PARAGRAPH.JUSTIFY)
+
+    buffer = BytesIO()
+    doc.save(buffer)
+    return buffer.getvalue()
+
+
+def measure(render, paper, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        data = render(paper)
+        times.append(time.perf_counter() - start)
+    return statistics.median(times) * 1000, len(data)
+
+
+def main(repeat=20):
+    generate_ieee_paper(synthetic_paper(4))  # build the cached template outside the timings
+
+    print(f"{'pages':>5} {'inline ms':>10} {'styled ms':>10} {'speedup':>8} {'inline KB':>10} {'styled KB':>10}")
+    for npages in (4, 8, 12, 16, 20):
+        paper = synthetic_paper(npages)
+        inline_ms, inline_size = measure(inline_render, paper, repeat)
+        styled_ms, styled_size = measure(generate_ieee_paper, paper, repeat)
+        print(f"{npages:>5} {inline_ms:>10.2f} {styled_ms:>10.2f} {inline_ms / styled_ms:>7.2f}x "
+              f"{inline_size / 1024:>10.1f} {styled_size / 1024:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+from services.cache import LLMCache, cache_key
+
+
+def test_key_depends_on_every_part():
+    assert cache_key("model", "Abstract", "prompt") == cache_key("model", "Abstract", "prompt")
+    assert cache_key("model", "Abstract", "prompt") != cache_key("model", "Results", "prompt")
+    assert cache_key("model", "Abstract", "prompt") != cache_key("other", "Abstract", "prompt")
+
+
+def test_lru_eviction():
+    cache = LLMCache(max_entries=2)
+    cache.set("a", "1")
+    cache.set("b", "2")
+    cache.get("a")
+    cache.set("c", "3")
+
+    assert cache.get("b") is None
+    assert cache.get("a") == "1"
+    assert cache.get("c") == "3"
+    assert cache.stats()["evictions"] == 1
+
+
+def test_ttl_expiry(monkeypatch):
+    clock = [1000.0]
+    monkeypatch.setattr("services.cache.time.time", lambda: clock[0])
+    cache = LLMCache(ttl=10)
+    cache.set("a", "1")
+
+    clock[0] += 5
+    assert cache.get("a") == "1"
+    clock[0] += 10
+    assert cache.get("a") is None
+    assert cache.stats()["expired"] == 1
+
+
+def test_disk_tier_survives_a_new_process(tmp_path):
+    path = str(tmp_path / "cache.sqlite")
+    LLMCache(path=path).set("a", "1")
+
+    cache = LLMCache(path=path)
+    assert cache.get("a") == "1"
+    assert cache.get("a") == "1"
+    stats = cache.stats()
+    assert stats["disk_hits"] == 1
+    assert stats["hits"] == 1
+
+
+def test_disk_tier_size_limit(tmp_path):
+    cache = LLMCache(max_entries=1, path=str(tmp_path / "cache.sqlite"), max_disk_entries=2)
+    for key in "abc":
+        cache.set(key, key)
+
+    assert cache.stats()["disk_entries"] == 2
+    assert cache.get("a") is None
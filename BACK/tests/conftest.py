@@ -0,0 +1,28 @@
+import pytest
+
+from services import llm, digest
+from services.cache import LLMCache
+from services.hedging import LatencyTracker
+from tests.fakeServer import FakeOpenAIServer
+
+
+@pytest.fixture
+def fakeLLM(monkeypatch):
+    servers = []
+
+    def start(**kwargs):
+        server = FakeOpenAIServer(**kwargs).start()
+        servers.append(server)
+        monkeypatch.setattr(llm, "LLM_BASE_URL", server.baseUrl)
+        monkeypatch.setattr(llm, "LLM_API_KEY", "test-key")
+        monkeypatch.setattr(llm, "LLM_BACKOFF_BASE", 0.01)
+        monkeypatch.setattr(llm, "_client", None)
+        monkeypatch.setattr(llm, "_cache", LLMCache())
+        monkeypatch.setattr(digest, "_digests", LLMCache())
+        monkeypatch.setattr(llm, "_latencies", LatencyTracker(min_samples=1))
+        return server
+
+    yield start
+    for server in servers:
+        server.stop()
+    llm._client = None
@@ -0,0 +1,65 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from services import digest
+
+
+def test_short_overview_is_not_digested(fakeLLM):
+    server = fakeLLM(text="summary")
+
+    assert digest.digest_overview("a short overview of the project") == "a short overview of the project"
+    assert server.requests == []
+
+
+def test_split_chunks_respects_paragraphs_and_size():
+    text = "\n\n".join(["a" * 40, "b" * 40, "word " * 30])
+    chunks = digest.split_chunks(text, size=90)
+
+    assert chunks[0] == "a" * 40 + "\n\n" + "b" * 40
+    assert all(len(chunk) <= 90 for chunk in chunks)
+    assert " ".join(chunks[1:]).split() == ["word"] * 30
+
+
+def test_long_overview_is_digested_once(fakeLLM, monkeypatch):
+    monkeypatch.setattr(digest, "OVERVIEW_DIGEST_THRESHOLD", 100)
+    monkeypatch.setattr(digest, "DIGEST_CHUNK_CHARS", 200)
+    server = fakeLLM(text="condensed facts")
+    overview = "\n\n".join(f"Paragraph {i} " + "detail " * 20 for i in range(4))
+
+    assert digest.digest_overview(overview) == "condensed facts"
+    calls = len(server.requests)
+    assert calls == len(digest.split_chunks(overview)) + 1
+
+    # same content hash: every call is served from the cache
+    assert digest.digest_overview(overview) == "condensed facts"
+    assert len(server.requests) == calls
+
+
+def test_digest_is_memoized_without_the_llm_cache(fakeLLM, monkeypatch):
+    from services import llm
+
+    monkeypatch.setattr(digest, "OVERVIEW_DIGEST_THRESHOLD", 100)
+    monkeypatch.setattr(llm, "LLM_CACHE_ENABLED", False)
+    server = fakeLLM(text="condensed facts")
+    overview = "One long paragraph " + "detail " * 40
+
+    assert digest.digest_overview(overview) == "condensed facts"
+    assert digest.digest_overview(overview) == "condensed facts"
+    assert len(server.requests) == 1
+
+
+def test_every_digest_call_goes_through_the_given_lane(fakeLLM, monkeypatch):
+    monkeypatch.setattr(digest, "OVERVIEW_DIGEST_THRESHOLD", 100)
+    monkeypatch.setattr(digest, "DIGEST_CHUNK_CHARS", 200)
+    server = fakeLLM(text="condensed facts")
+    overview = "\n\n".join(f"Paragraph {i} " + "detail " * 20 for i in range(4))
+    submitted = []
+
+    class Lane:
+        def submit(self, fn, *args):
+            submitted.append(args)
+            return executor.submit(fn, *args)
+
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        assert digest.digest_overview(overview, pool=Lane()) == "condensed facts"
+
+    assert len(submitted) == len(server.requests) == len(digest.split_chunks(overview)) + 1
@@ -0,0 +1,260 @@
+import re
+import json
+import math
+import time
+import random
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+SECTION_NAMES = ["Abstract", "Introduction", "Literature Review", "Methodology", "Results"]
+VOCABULARY = (
+    "phishing detection model feature extension browser accuracy dataset real-time classifier "
+    "evaluation precision recall network security system approach results method analysis "
+    "the of and a to in is for with on that by this we our"
+).split()
+
+
+# --------------------------------------------------
+# Latency distributions: callables taking the request body
+# --------------------------------------------------
+def constantLatency(seconds):
+    return lambda body: seconds
+
+
+def lognormalLatency(median, sigma=0.5, seed=0):
+    """Right-skewed latency around `median`, like a real provider's time to first token"""
+    rng = random.Random(seed)
+    lock = threading.Lock()
+
+    def latency(body):
+        with lock:
+            return rng.lognormvariate(math.log(median), sigma)
+    return latency
+
+
+def tailLatency(base, slowFraction=0.05, slowFactor=6.0, seed=0):
+    """`base` latencies, with `slowFraction` of requests `slowFactor` times slower (stragglers)"""
+    rng = random.Random(seed)
+    lock = threading.Lock()
+
+    def latency(body):
+        with lock:
+            slow = rng.random() < slowFraction
+        value = base(body)
+        return value * slowFactor if slow else value
+    return latency
+
+
+LATENCY_PROFILES = {
+    "none": lambda: constantLatency(0.0),
+    "fast": lambda: lognormalLatency(0.05, 0.3),
+    "realistic": lambda: lognormalLatency(0.8, 0.5),
+    "heavy-tail": lambda: tailLatency(lognormalLatency(0.8, 0.5)),
+}
+
+
+# --------------------------------------------------
+# Canned responses sized like the real ones
+# --------------------------------------------------
+def cannedText(wordsPerParagraph=110, defaultParagraphs=3, references=10, seed=0):
+    """Text callable answering PaperForge prompts: paragraph/word counts are read from the
+    section prompt, References and Title get their own shape, single-call mode gets JSON"""
+    rng = random.Random(seed)
+    lock = threading.Lock()
+
+    def paragraphs(count, words):
+        with lock:
+            return "\n\n".join(
+                " ".join(rng.choice(VOCABULARY) for _ in range(max(1, words // count)))
+                for _ in range(count)
+            )
+
+    def refs(count):
+        return "\n\n".join(f"[{i}] A. Author, \"Paper {i},\" Journal, vol. {i}, pp. 1-10, 2020." for i in range(1, count + 1))
+
+    def section(prompt, name):
+        match = re.search(rf'"?{re.escape(name)}"?:? (\d+) paragraphs(?:, about (\d+) words)?', prompt) \
+            or re.search(rf"(\d+) paragraphs on the {re.escape(name)} section(?:.*?about (\d+) words)?", prompt)
+        count = int(match.group(1)) if match else defaultParagraphs
+        words = int(match.group(2)) if match and match.group(2) else count * wordsPerParagraph
+        return paragraphs(count, words)
+
+    def text(body):
+        prompt = body["messages"][-1]["content"]
+        if "single JSON object" in prompt:
+            paper = {"Title": "Real-Time Phishing Detection in the Browser"}
+            paper.update({name: section(prompt, name) for name in SECTION_NAMES})
+            paper["References"] = refs(references)
+            return json.dumps(paper)
+        match = re.search(r"paragraphs on the (.+?) section", prompt)
+        if match:
+            return section(prompt, match.group(1))
+        if "References for the research paper" in prompt:
+            count = re.search(r"generate a (\d+) References", prompt)
+            return refs(int(count.group(1)) if count else references)
+        if "TITLE" in prompt:
+            return "Real-Time Phishing Detection in the Browser"
+        return paragraphs(1, wordsPerParagraph)
+    return text
+
+
+class FakeOpenAIServer:
+    """Local stand-in for an OpenAI-compatible /v1/chat/completions endpoint.
+
+    `script` is a list of HTTP status codes consumed one per request (200 or an
+    error such as 429/500); once it runs out every request succeeds. `text` and
+    `latency` may be callables taking the request body; `tokenDelay` is slept
+    between streamed words to model decode time.
+    """
+
+    def __init__(self, text="Generated text for the section.", latency=0.0, script=None, tokenDelay=0.0):
+        self.text = text
+        self.latency = latency
+        self.tokenDelay = tokenDelay
+        self.script = list(script or [])
+        self.requests = []
+        self.active = 0
+        self.maxActive = 0
+        self._lock = threading.Lock()
+        self._server = None
+        self._thread = None
+
+    @property
+    def baseUrl(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def start(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+                server.handle(self, body)
+
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def handle(self, handler, body):
+        with self._lock:
+            self.requests.append(body)
+            status = self.script.pop(0) if self.script else 200
+            self.active += 1
+            self.maxActive = max(self.maxActive, self.active)
+
+        try:
+            latency = self.latency(body) if callable(self.latency) else self.latency
+            if latency:
+                time.sleep(latency)
+
+            if status != 200:
+                payload = json.dumps({"error": {"message": f"fake error {status}"}}).encode()
+                handler.send_response(status)
+                handler.send_header("Content-Type", "application/json")
+                handler.send_header("Content-Length", str(len(payload)))
+                handler.end_headers()
+                handler.wfile.write(payload)
+                return
+
+            text = self.text(body) if callable(self.text) else self.text
+            if body.get("stream"):
+                self.sendStream(handler, body, text)
+            else:
+                self.sendCompletion(handler, body, text)
+        finally:
+            with self._lock:
+                self.active -= 1
+
+    def usage(self, body, text):
+        promptTokens = sum(len(m["content"]) for m in body["messages"]) // 4
+        completionTokens = len(text) // 4
+        return {
+            "prompt_tokens": promptTokens,
+            "completion_tokens": completionTokens,
+            "total_tokens": promptTokens + completionTokens,
+        }
+
+    def sendCompletion(self, handler, body, text):
+        payload = json.dumps({
+            "id": "chatcmpl-fake",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body["model"],
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": text},
+                "finish_reason": "stop",
+            }],
+            "usage": self.usage(body, text),
+        }).encode()
+        handler.send_response(200)
+        handler.send_header("Content-Type", "application/json")
+        handler.send_header("Content-Length", str(len(payload)))
+        handler.end_headers()
+        handler.wfile.write(payload)
+
+    def sendStream(self, handler, body, text):
+        handler.send_response(200)
+        handler.send_header("Content-Type", "text/event-stream")
+        handler.send_header("Transfer-Encoding", "chunked")
+        handler.end_headers()
+
+        def write(data):
+            handler.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+            handler.wfile.flush()
+
+        def send(chunk):
+            write(f"data: {json.dumps(chunk)}\n\n".encode())
+
+        words = text.split(" ")
+        for i, word in enumerate(words):
+            if self.tokenDelay and i:
+                time.sleep(self.tokenDelay)
+            send({
+                "id": "chatcmpl-fake",
+                "object": "chat.completion.chunk",
+                "created": int(time.time()),
+                "model": body["model"],
+                "choices": [{
+                    "index": 0,
+                    "delta": {"content": word if i == 0 else " " + word},
+                    "finish_reason": None,
+                }],
+            })
+        send({
+            "id": "chatcmpl-fake",
+            "object": "chat.completion.chunk",
+            "created": int(time.time()),
+            "model": body["model"],
+            "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}],
+        })
+        if (body.get("stream_options") or {}).get("include_usage"):
+            send({
+                "id": "chatcmpl-fake",
+                "object": "chat.completion.chunk",
+                "created": int(time.time()),
+                "model": body["model"],
+                "choices": [],
+                "usage": self.usage(body, text),
+            })
+        write(b"data: [DONE]\n\n")
+        handler.wfile.write(b"0\r\n\r\n")
+        handler.wfile.flush()
@@ -0,0 +1,41 @@
+from io import BytesIO
+
+from docx import Document
+
+from services.ieeeFormat import generate_ieee_paper, prepare_section
+
+
+def paragraphs(data):
+    return [(p.style.name, p.text) for p in Document(BytesIO(data)).paragraphs]
+
+
+def test_sections_are_numbered_in_order():
+    paper = {"Title": "T", "Abstract": "A", "Introduction": "I", "Results": "R", "References": "[1] R\n\n[2] S"}
+
+    assert paragraphs(generate_ieee_paper(paper)) == [
+        ("IEEE Title", "T"),
+        ("Normal", ""),
+        ("IEEE Heading", "Abstract"),
+        ("IEEE Abstract", "A"),
+        ("IEEE Heading", "I. Introduction"),
+        ("IEEE Body", "I"),
+        ("Normal", ""),
+        ("IEEE Heading", "II. Results"),
+        ("IEEE Body", "R"),
+        ("Normal", ""),
+        ("IEEE Heading", "References"),
+        ("IEEE Body", "[1] R"),
+        ("IEEE Body", "[2] S"),
+    ]
+
+
+def test_prepared_sections_render_like_raw_ones():
+    paper = {
+        "Title": "T",
+        "Abstract": "Abstract\nA",
+        "Introduction": "## I. Introduction\n\nFirst.\n\nSecond.",
+        "References": "References\n[1] R\n[2] S",
+    }
+    prepared = {name: prepare_section(name, text) for name, text in paper.items()}
+
+    assert paragraphs(generate_ieee_paper(prepared, clean=False)) == paragraphs(generate_ieee_paper(paper))
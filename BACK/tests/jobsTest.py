@@ -0,0 +1,116 @@
+import asyncio
+
+import pytest
+
+from services import jobs
+from services.jobs import JobStore, QueueFull
+from services.executors import shutdown_pools
+
+
+@pytest.fixture
+def store(tmp_path):
+    return JobStore(str(tmp_path / "jobs.sqlite"))
+
+
+def test_jobs_are_claimed_once_in_submission_order(store):
+    first = store.create({"n": 1})
+    second = store.create({"n": 2})
+
+    assert store.claim_next() == first
+    assert store.claim_next() == second
+    assert store.claim_next() is None
+    assert store.get(first)["status"] == "running"
+
+
+def test_queue_is_bounded(store):
+    store.create({}, max_queued=2)
+    store.create({}, max_queued=2)
+
+    with pytest.raises(QueueFull):
+        store.create({}, max_queued=2)
+
+    store.claim_next()
+    store.create({}, max_queued=2)
+
+
+def test_events_replay_after_last_event_id(store):
+    job_id = store.create({})
+    for stage in ("validation", "prompt_generation", "llm_response"):
+        store.add_event(job_id, stage, "started", {})
+
+    assert [e[1] for e in store.events_after(job_id)] == ["validation", "prompt_generation", "llm_response"]
+    assert store.events_after(job_id, 2) == [(3, "llm_response", "started", {})]
+
+
+def test_stale_running_jobs_are_requeued(store):
+    job_id = store.create({})
+    store.claim_next()
+    store.add_event(job_id, "validation", "started", {})
+
+    assert store.requeue_stale(lease=60) == []
+    assert store.requeue_stale(lease=-1) == [job_id]
+    assert store.get(job_id)["status"] == "queued"
+    assert store.events_after(job_id) == []
+
+
+def test_finished_jobs_are_pruned_after_retention(store):
+    done = store.create({})
+    store.claim_next()
+    store.add_event(done, "validation", "started", {})
+    store.finish(done, "succeeded", b"docx")
+    running = store.create({})
+    store.claim_next()
+
+    assert store.prune(retention=60) == 0
+    assert store.prune(retention=-1) == 1
+    assert store.get(done) is None and store.events_after(done) == []
+    assert store.get(running)["status"] == "running"
+
+
+def test_job_log_keeps_one_delta_per_section(store, fakeLLM):
+    fakeLLM(text=" ".join(["word"] * 200))
+    job_id = store.create({"overview": "A browser extension that detects phishing pages in real time.",
+                           "format": "IEEE", "npages": 4})
+    store.claim_next()
+
+    try:
+        asyncio.run(jobs.run_job(store, job_id))
+    finally:
+        shutdown_pools()
+
+    events = store.events_after(job_id)
+    deltas = [e[3]["section"] for e in events if e[2] == "section_delta"]
+    completed = [e[3]["section"] for e in events if e[2] == "section_completed"]
+    assert sorted(deltas) == sorted(completed) and len(deltas) == len(set(deltas)) == 7
+    assert store.get(job_id)["status"] == "succeeded"
+    # the worker's artifact store is not the API's: the event points at the job result
+    assert events[-1][3]["url"] == f"/jobs/{job_id}/result" and "paper_id" not in events[-1][3]
+
+
+def test_own_running_jobs_are_not_requeued(store):
+    job_id = store.create({})
+    store.claim_next()
+
+    assert store.requeue_stale(lease=-1, exclude={job_id}) == []
+    assert store.get(job_id)["status"] == "running"
+
+
+def test_heartbeat_keeps_a_slow_job_leased(store, fakeLLM, monkeypatch):
+    fakeLLM(text="slow section", latency=0.6)
+    monkeypatch.setattr(jobs, "JOB_HEARTBEAT_SECONDS", 0.05)
+    job_id = store.create({"overview": "A browser extension that detects phishing pages in real time.",
+                           "format": "IEEE", "npages": 4})
+    store.claim_next()
+
+    async def run_and_check():
+        job = asyncio.create_task(jobs.run_job(store, job_id))
+        await asyncio.sleep(1.0)  # validation, then a section call with no events for a while
+        stale = store.requeue_stale(lease=0.3)
+        await job
+        return stale
+
+    try:
+        assert asyncio.run(run_and_check()) == []
+    finally:
+        shutdown_pools()
+    assert store.get(job_id)["status"] == "succeeded"
@@ -0,0 +1,43 @@
+import json
+
+from utils.jsonstream import StreamingObjectParser
+
+
+def feed_in_chunks(parser, text, size):
+    for start in range(0, len(text), size):
+        parser.feed(text[start:start + size])
+
+
+def test_values_are_decoded_across_chunk_boundaries():
+    paper = {"Title": 'A "quoted" title é \U0001F600', "Abstract": "one\n\ntwo\t\\three"}
+    deltas, values = {}, {}
+
+    for ensure_ascii in (True, False):
+        for size in (1, 3, 7):
+            deltas.clear()
+            parser = StreamingObjectParser(
+                lambda key, text: deltas.__setitem__(key, deltas.get(key, "") + text),
+                values.__setitem__,
+            )
+            feed_in_chunks(parser, "```json\n" + json.dumps(paper, indent=2, ensure_ascii=ensure_ascii) + "\n```", size)
+
+            assert parser.done
+            assert parser.values == paper
+            assert deltas == paper
+    assert values == paper
+
+
+def test_string_arrays_are_joined_and_other_values_are_malformed():
+    parser = StreamingObjectParser()
+    parser.feed('{"References": ["[1] A", "[2] B"], "Results": {"x": 1}, "Methodology": "", "Title": 3}')
+
+    assert parser.values == {"References": "[1] A\n\n[2] B"}
+    assert parser.malformed == {"Results", "Methodology", "Title"}
+
+
+def test_truncated_object_keeps_completed_values():
+    parser = StreamingObjectParser()
+    parser.feed('{"Title": "T", "Abstract": "cut o')
+
+    assert not parser.done
+    assert parser.values == {"Title": "T"}
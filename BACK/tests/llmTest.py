@@ -0,0 +1,282 @@
+import json
+import time
+import threading
+
+import openai
+import pytest
+
+from services import llm
+from services.hedging import HedgeBudget, CallHandle
+
+
+def test_client_is_reused_across_calls(fakeLLM):
+    server = fakeLLM(text="hello world")
+
+    assert llm.getLLMResponse("a") == "hello world"
+    client = llm.getClient()
+    assert llm.getLLMResponse("b") == "hello world"
+
+    assert llm.getClient() is client
+    assert len(server.requests) == 2
+
+
+def test_retries_on_rate_limit_and_server_errors(fakeLLM):
+    server = fakeLLM(text="recovered", script=[429, 500, 503])
+
+    assert llm.getLLMResponse("prompt") == "recovered"
+    assert len(server.requests) == 4
+
+
+def test_gives_up_after_max_retries(fakeLLM, monkeypatch):
+    monkeypatch.setattr(llm, "LLM_MAX_RETRIES", 2)
+    server = fakeLLM(script=[500, 500, 500, 500])
+
+    with pytest.raises(openai.InternalServerError):
+        llm.getLLMResponse("prompt")
+    assert len(server.requests) == 3
+
+
+def test_client_errors_are_not_retried(fakeLLM):
+    server = fakeLLM(script=[400])
+
+    with pytest.raises(openai.BadRequestError):
+        llm.getLLMResponse("prompt")
+    assert len(server.requests) == 1
+
+
+def test_per_call_timeout(fakeLLM, monkeypatch):
+    monkeypatch.setattr(llm, "LLM_MAX_RETRIES", 0)
+    fakeLLM(latency=1.0)
+
+    with pytest.raises(openai.APITimeoutError):
+        llm.getLLMResponse("prompt", timeout=0.2)
+
+
+def test_semaphore_caps_concurrent_calls(fakeLLM, monkeypatch):
+    monkeypatch.setattr(llm, "_semaphore", threading.BoundedSemaphore(2))
+    server = fakeLLM(latency=0.1)
+
+    threads = [threading.Thread(target=llm.getLLMResponse, args=("p",)) for _ in range(6)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert len(server.requests) == 6
+    assert server.maxActive == 2
+
+
+def test_streamed_deltas_restart_after_retry(fakeLLM):
+    fakeLLM(text="one two three", script=[500])
+    chunks = []
+
+    assert llm.getLLMResponse("prompt", onDelta=chunks.append) == "one two three"
+    assert "".join(chunks) == "one two three"
+
+
+def test_cached_section_is_not_requested_again(fakeLLM):
+    server = fakeLLM(text="cached text")
+    chunks = []
+
+    assert llm.getLLMResponse("prompt", section="Abstract") == "cached text"
+    assert llm.getLLMResponse("prompt", section="Abstract", onDelta=chunks.append) == "cached text"
+    assert chunks == ["cached text"]
+    assert len(server.requests) == 1
+
+    llm.getLLMResponse("prompt", section="Results")
+    llm.getLLMResponse("prompt", section="Abstract", useCache=False)
+    assert len(server.requests) == 3
+    assert llm.cacheStats()["hits"] == 1
+
+
+def test_plan_sets_section_budgets(fakeLLM):
+    from services.planner import plan_paper
+
+    server = fakeLLM(text="text")
+    plan = plan_paper(4)
+    llm.sendRequest("overview", plan=plan)
+
+    budgets = sorted(body.get("max_tokens") for body in server.requests)
+    assert budgets == sorted(section["max_tokens"] for section in plan.values())
+
+
+def test_sections_run_in_parallel_up_to_the_concurrency(fakeLLM):
+    from tests.fakeServer import cannedText
+
+    server = fakeLLM(text=cannedText(), latency=0.1)
+    prompts = llm.buildPrompts("overview")
+
+    result = llm.generateSections("overview", prompts, {}, concurrency=3)
+
+    assert list(result) == list(prompts)
+    assert len(server.requests) == len(prompts)
+    assert server.maxActive == 3
+
+
+def test_references_wait_for_the_body_when_they_use_it(fakeLLM, monkeypatch):
+    from tests.fakeServer import cannedText
+
+    monkeypatch.setattr(llm, "REFERENCES_USE_SECTIONS", True)
+    server = fakeLLM(text=cannedText(wordsPerParagraph=300), latency=0.05)
+    prompts = llm.buildPrompts("overview")
+    completed = []
+
+    result = llm.generateSections("overview", prompts, {}, concurrency=len(prompts), onSection=lambda name, text: completed.append(name))
+
+    assert completed[-1] == "References"
+    assert server.maxActive == len(prompts) - 1
+    refsPrompt = server.requests[-1]["messages"][-1]["content"]
+    assert "References for the research paper" in refsPrompt
+    for name in llm.SECTIONS:
+        assert result[name][:llm.REFERENCES_EXCERPT_CHARS].strip() in refsPrompt
+        assert result[name] not in refsPrompt
+
+
+def test_single_mode_sends_the_overview_once(fakeLLM):
+    paper = {name: f"{name} text." for name in ["Title"] + llm.SECTIONS + ["References"]}
+    server = fakeLLM(text=json.dumps(paper))
+    deltas, completed = {}, []
+
+    def onDelta(section, chunk):
+        deltas[section] = deltas.get(section, "") + chunk
+
+    result = llm.sendRequestStructured(
+        "overview", onDelta=onDelta, onSection=lambda name, text: completed.append(name)
+    )
+
+    assert result == paper
+    assert list(result) == list(paper)
+    assert completed == list(paper)
+    assert deltas == paper
+    assert len(server.requests) == 1
+
+
+def test_single_mode_rerequests_only_missing_keys(fakeLLM):
+    partial = '```json\n{"Title": "T", "Abstract": "A", "Introduction": ["x", 1], "Literature Review": "cut o'
+
+    def text(body):
+        return partial if "single JSON object" in body["messages"][0]["content"] else "filled"
+
+    server = fakeLLM(text=text)
+    resets = []
+
+    result = llm.sendRequestStructured(
+        "overview", onDelta=lambda section, chunk: chunk is None and resets.append(section)
+    )
+
+    assert result["Title"] == "T" and result["Abstract"] == "A"
+    for name in ["Introduction", "Literature Review", "Methodology", "Results", "References"]:
+        assert result[name] == "filled"
+    assert len(server.requests) == 1 + 5
+    assert resets == ["Literature Review"]
+
+
+def test_call_stats_report_usage_and_ttft(fakeLLM):
+    fakeLLM(text="one two three four")
+    stats = {}
+
+    llm.getLLMResponse("prompt", section="Abstract", stats=stats)
+    assert stats["cached"] is False and stats["attempts"] == 1
+    assert stats["completion_tokens"] == len("one two three four") // 4
+    assert stats["prompt_tokens"] > 0
+    assert 0 < stats["ttft"] <= stats["seconds"]
+
+    cached = {}
+    llm.getLLMResponse("prompt", section="Abstract", stats=cached)
+    assert cached["cached"] is True and "ttft" not in cached
+
+
+def test_hedge_fires_for_a_slow_call_and_wins(fakeLLM, monkeypatch):
+    monkeypatch.setattr(llm, "LLM_HEDGE_MIN_DELAY", 0.1)
+    latencies = iter([1.5])
+    server = fakeLLM(text="fast answer", latency=lambda body: next(latencies, 0))
+    llm._latencies.record("Abstract", 0.05)
+    chunks, stats = [], {}
+    budget = HedgeBudget(1)
+
+    start = time.perf_counter()
+    text = llm.getLLMResponse("prompt", section="Abstract", onDelta=chunks.append, stats=stats, hedge=budget)
+
+    assert text == "fast answer"
+    assert time.perf_counter() - start < 1.0
+    assert "".join(chunks) == "fast answer"
+    assert stats["hedged"] is True and budget.used == 1
+    assert len(server.requests) == 2
+
+
+def test_hedge_request_goes_through_the_callers_lane(fakeLLM, monkeypatch):
+    from concurrent.futures import ThreadPoolExecutor
+
+    monkeypatch.setattr(llm, "LLM_HEDGE_MIN_DELAY", 0.1)
+    latencies = iter([1.0])
+    server = fakeLLM(text="fast answer", latency=lambda body: next(latencies, 0))
+    llm._latencies.record("Abstract", 0.05)
+    submitted = []
+
+    class Lane:
+        def submit(self, fn, *args):
+            submitted.append(fn)
+            return executor.submit(fn, *args)
+
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        text = llm.getLLMResponse("prompt", section="Abstract", hedge=HedgeBudget(1), pool=Lane())
+
+    assert text == "fast answer"
+    assert len(submitted) == 1 and len(server.requests) == 2
+
+
+def test_hedge_respects_the_budget(fakeLLM, monkeypatch):
+    monkeypatch.setattr(llm, "LLM_HEDGE_MIN_DELAY", 0.05)
+    server = fakeLLM(text="slow answer", latency=0.3)
+    llm._latencies.record("Abstract", 0.01)
+    stats = {}
+
+    assert llm.getLLMResponse("prompt", section="Abstract", stats=stats, hedge=HedgeBudget(0)) == "slow answer"
+    assert stats["hedged"] is False
+    assert len(server.requests) == 1
+
+
+def test_hedge_delay_ignores_time_queued_behind_the_semaphore(fakeLLM, monkeypatch):
+    monkeypatch.setattr(llm, "LLM_HEDGE_MIN_DELAY", 0.1)
+    monkeypatch.setattr(llm, "_semaphore", threading.BoundedSemaphore(2))
+    server = fakeLLM(text="steady", latency=0.3)
+    llm._latencies.record("Abstract", 0.6)
+    stats = [{} for _ in range(6)]
+
+    threads = [
+        threading.Thread(target=llm.getLLMResponse, args=("p",),
+                         kwargs={"section": "Abstract", "stats": s, "hedge": HedgeBudget(1)})
+        for s in stats
+    ]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    # the last calls waited ~0.6s for a slot, but the provider itself was never slow
+    assert not any(s["hedged"] for s in stats)
+    assert len(server.requests) == 6
+    assert all(s["provider_seconds"] < 0.6 for s in stats)
+
+
+def test_cancelled_call_never_reaches_the_provider(fakeLLM):
+    server = fakeLLM(text="unused")
+    handle = CallHandle()
+    handle.cancel()
+
+    assert llm.fetchLLMResponse("prompt", handle=handle) == ""
+    assert len(server.requests) == 0
+
+
+def test_regenerate_only_requests_named_sections(fakeLLM):
+    server = fakeLLM(text="first")
+    sections = llm.sendRequest("overview")
+    assert len(server.requests) == 7
+
+    server.text = "second"
+    result = llm.regenerateSections("overview", sections, {"Methodology"})
+
+    assert list(result) == list(sections)
+    assert result["Methodology"] == "second"
+    assert all(text == "first" for name, text in result.items() if name != "Methodology")
+    assert len(server.requests) == 8  # the cached Methodology text is bypassed
@@ -0,0 +1,36 @@
+from services.metrics import Counter, Histogram, REGISTRY, render_metrics
+
+
+def test_histogram_renders_cumulative_buckets():
+    histogram = Histogram("test_latency_seconds", "Test latency", ["stage"], buckets=(1, 5))
+    REGISTRY.remove(histogram)
+    for value in (0.5, 2, 2, 30):
+        histogram.observe(value, stage="llm")
+
+    assert histogram.render() == [
+        "# HELP test_latency_seconds Test latency",
+        "# TYPE test_latency_seconds histogram",
+        'test_latency_seconds_bucket{stage="llm",le="1"} 1',
+        'test_latency_seconds_bucket{stage="llm",le="5"} 3',
+        'test_latency_seconds_bucket{stage="llm",le="+Inf"} 4',
+        'test_latency_seconds_sum{stage="llm"} 34.5',
+        'test_latency_seconds_count{stage="llm"} 4',
+    ]
+
+
+def test_counter_and_extra_stats():
+    counter = Counter("test_tokens_total", "Test tokens", ["kind"])
+    try:
+        counter.inc(10, kind="prompt")
+        counter.inc(5, kind="prompt")
+        body = render_metrics(
+            {"test_cache": {"hits": 3, "hit_rate": 0.75, "enabled": True}},
+            counters={"test_cache": ("hits",)},
+        )
+    finally:
+        REGISTRY.remove(counter)
+
+    assert 'test_tokens_total{kind="prompt"} 15' in body
+    assert "# TYPE test_cache_hits_total counter\ntest_cache_hits_total 3" in body
+    assert "# TYPE test_cache_hit_rate gauge\ntest_cache_hit_rate 0.75" in body
+    assert "enabled" not in body
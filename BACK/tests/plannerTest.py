@@ -0,0 +1,46 @@
+import pytest
+
+from services.planner import plan_paper, estimate_pages, SECTION_WEIGHTS, SECTION_MAX_TOKENS
+
+
+def paper_from_plan(plan):
+    paper = {"Title": "Real-Time Phishing Website Detection with XGBoost"}
+    for name in SECTION_WEIGHTS:
+        section = plan[name]
+        words = section["words"] // section["paragraphs"]
+        paper[name] = "\n".join(" ".join(["lorem"] * words) for _ in range(section["paragraphs"]))
+    paper["References"] = "\n\n".join(
+        f"[{i}] A. Author and B. Author, \"A study of phishing detection,\" IEEE Access, vol. 7, pp. 1-10, 2019."
+        for i in range(1, plan["References"]["count"] + 1)
+    )
+    return paper
+
+
+def test_budgets_grow_with_page_count():
+    small, large = plan_paper(4), plan_paper(12)
+
+    for name in SECTION_WEIGHTS:
+        assert small[name]["max_tokens"] <= large[name]["max_tokens"]
+    assert sum(s["max_tokens"] for s in small.values()) < sum(s["max_tokens"] for s in large.values())
+    assert small["Abstract"]["paragraphs"] == 1
+
+
+@pytest.mark.parametrize("npages", [4, 6, 8, 12, 16, 20])
+def test_planned_paper_fills_the_target(npages):
+    assert estimate_pages(paper_from_plan(plan_paper(npages))) == pytest.approx(npages, rel=0.15)
+
+
+def test_capped_sections_hand_their_words_to_the_others():
+    plan = plan_paper(20)
+
+    assert all(plan[name]["max_tokens"] <= SECTION_MAX_TOKENS for name in SECTION_WEIGHTS)
+    assert plan["Abstract"]["words"] == 250
+    # without the cap Methodology would get 8/7 of Results; capped, the two are close
+    assert plan["Results"]["words"] > 0.9 * plan["Methodology"]["words"]
+
+
+def test_estimate_is_proportional_to_text():
+    short = {"Title": "T", "Introduction": "word " * 500}
+    long = {"Title": "T", "Introduction": "word " * 5000}
+
+    assert estimate_pages(long) > 5 * estimate_pages(short)
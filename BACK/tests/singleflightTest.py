@@ -0,0 +1,63 @@
+import asyncio
+
+from services.singleflight import SingleFlight, request_key
+from utils.schema import Schema
+
+
+def schema(overview, npages=4):
+    return Schema(overview=overview, format="IEEE", npages=npages)
+
+
+def test_request_key_normalizes_whitespace():
+    overview = "A browser extension that detects phishing pages in real time."
+
+    assert request_key(schema(overview)) == request_key(schema("  " + overview.replace(" ", "\n  ") + " "))
+    assert request_key(schema(overview)) != request_key(schema(overview, npages=6))
+
+
+def test_identical_requests_share_one_run():
+    runs = []
+
+    async def source():
+        runs.append(1)
+        for i in range(3):
+            await asyncio.sleep(0.01)
+            yield i
+
+    async def collect(flights):
+        return [event async for event in flights.run("key", source)]
+
+    async def main():
+        flights = SingleFlight()
+        first = asyncio.create_task(collect(flights))
+        await asyncio.sleep(0.015)  # join after the first event
+        results = await asyncio.gather(first, collect(flights), collect(flights))
+        return flights, results
+
+    flights, results = asyncio.run(main())
+    assert results == [[0, 1, 2]] * 3
+    assert len(runs) == 1
+    assert flights.stats() == {"in_flight": 0, "started": 1, "coalesced": 2}
+
+
+def test_run_is_cancelled_when_every_subscriber_leaves():
+    async def main():
+        flights = SingleFlight()
+        stopped = asyncio.Event()
+
+        async def source():
+            try:
+                yield "first"
+                await asyncio.sleep(10)
+                yield "never"
+            finally:
+                stopped.set()
+
+        stream = flights.run("key", source)
+        assert await stream.__anext__() == "first"
+        await stream.aclose()
+        await asyncio.wait_for(stopped.wait(), 1)
+        return flights
+
+    flights = asyncio.run(main())
+    assert flights.stats()["in_flight"] == 0
@@ -0,0 +1,65 @@
+import random
+
+from utils.textclean import StreamCleaner, clean_text, split_references
+
+NOISY = (
+    "Title: Real-Time Phishing Detection\n"
+    "\n"
+    "## II. Literature Review:\n"
+    "**Methodology**\n"
+    "---\n"
+    "  Our system extracts URL, DOM and certificate features on page load and scores them with a classifier.  \n"
+    "\n"
+    "* * *\n"
+    "Results\n"
+    "Short line.\n"
+    "Introduction to the feature set: every page yields 48 features, most of them cheap to compute.\r\n"
+    "==========\n"
+)
+
+
+def test_junk_lines_are_dropped():
+    assert clean_text(NOISY) == (
+        "Our system extracts URL, DOM and certificate features on page load and scores them with a classifier.\n"
+        "Short line.\n"
+        "Introduction to the feature set: every page yields 48 features, most of them cheap to compute."
+    )
+
+
+def test_any_chunking_gives_the_same_text():
+    rng = random.Random(0)
+    for _ in range(200):
+        cleaner = StreamCleaner()
+        out, i = [], 0
+        while i < len(NOISY):
+            step = rng.randint(1, 12)
+            out.append(cleaner.feed(NOISY[i:i + step]))
+            i += step
+        out.append(cleaner.close())
+        assert "".join(out) == clean_text(NOISY)
+
+
+def test_separator_keeps_paragraph_breaks():
+    cleaner = StreamCleaner(separator="\n\n")
+    out = "".join(cleaner.feed(NOISY[i:i + 5]) for i in range(0, len(NOISY), 5)) + cleaner.close()
+
+    assert out == clean_text(NOISY).replace("\n", "\n\n")
+
+
+def test_long_lines_stream_before_their_newline():
+    cleaner = StreamCleaner()
+    line = "Phishing pages imitate login forms of banks and webmail providers to harvest"
+    assert cleaner.feed(line[:40]) == ""
+    assert cleaner.feed(line[40:] + " ") == line
+    assert cleaner.feed("credentials.") == " credentials."
+    assert cleaner.feed("\nTitle: " + "x" * 100) == ""
+    assert cleaner.close() == ""
+
+
+def test_references_keep_their_markers():
+    refs = "References\n[1] A. Author, Paper one.\n[2] B. Author,\nPaper two.\n\nC. Author, Paper three."
+    assert split_references(refs) == [
+        "[1] A. Author, Paper one.",
+        "[2] B. Author,\nPaper two.",
+        "C. Author, Paper three.",
+    ]
@@ -0,0 +1,185 @@
+import json
+
+WHITESPACE = " \t\r\n"
+ESCAPES = {'"': '"', "\\": "\\", "/": "/", "b": "\b", "f": "\f", "n": "\n", "r": "\r", "t": "\t"}
+
+
+class StreamingObjectParser:
+    """Incremental parser for one flat JSON object streamed in arbitrary chunks.
+
+    String values are decoded as they arrive: `on_delta(key, text)` fires with
+    the newly decoded part of the current value after every `feed`, and
+    `on_value(key, value)` fires once a value is complete. Arrays of strings are
+    accepted and joined with blank lines; any other value is recorded in
+    `malformed`. Text before the opening brace (e.g. a ```json fence) is skipped.
+    """
+
+    def __init__(self, on_delta=None, on_value=None):
+        self.on_delta = on_delta
+        self.on_value = on_value
+        self.values = {}
+        self.malformed = set()
+        self.done = False
+
+        self._state = "before"
+        self._key = None
+        self._buf = []        # current key or decoded string value
+        self._pending = []    # decoded value text not yet reported through on_delta
+        self._raw_text = []   # non-string value, parsed when it ends
+        self._depth = 0
+        self._raw_in_string = False
+        self._raw_escape = False
+        self._unicode = None
+        self._high_surrogate = None
+
+    def feed(self, chunk):
+        for ch in chunk:
+            if self.done:
+                break
+            getattr(self, "_on_" + self._state)(ch)
+        self._flush()
+
+    # ---------------- object structure ----------------
+
+    def _on_before(self, ch):
+        if ch == "{":
+            self._state = "key_or_end"
+
+    def _on_key_or_end(self, ch):
+        if ch == '"':
+            self._buf = []
+            self._state = "key"
+        elif ch == "}":
+            self.done = True
+
+    def _on_key(self, ch):
+        if ch == "\\":
+            self._state = "key_escape"
+        elif ch == '"':
+            self._key = "".join(self._buf)
+            self._state = "colon"
+        else:
+            self._buf.append(ch)
+
+    def _on_key_escape(self, ch):
+        self._buf.append(ESCAPES.get(ch, ch))
+        self._state = "key"
+
+    def _on_colon(self, ch):
+        if ch == ":":
+            self._state = "value_start"
+
+    def _on_value_start(self, ch):
+        if ch in WHITESPACE:
+            return
+        if ch == '"':
+            self._buf = []
+            self._state = "string"
+        else:
+            self._raw_text = []
+            self._depth = 0
+            self._raw_in_string = False
+            self._raw_escape = False
+            self._state = "raw"
+            self._raw_char(ch)
+
+    def _on_after_value(self, ch):
+        if ch == ",":
+            self._state = "key_or_end"
+        elif ch == "}":
+            self.done = True
+
+    # ---------------- string values ----------------
+
+    def _on_string(self, ch):
+        if ch == "\\":
+            self._state = "string_escape"
+        elif ch == '"':
+            self._flush()
+            self._finish_value("".join(self._buf))
+            self._state = "after_value"
+        else:
+            self._emit(ch)
+
+    def _on_string_escape(self, ch):
+        if ch == "u":
+            self._unicode = []
+            self._state = "string_unicode"
+        else:
+            self._emit(ESCAPES.get(ch, ch))
+            self._state = "string"
+
+    def _on_string_unicode(self, ch):
+        self._unicode.append(ch)
+        if len(self._unicode) < 4:
+            return
+        self._state = "string"
+        try:
+            code = int("".join(self._unicode), 16)
+        except ValueError:
+            return
+        if 0xD800 <= code < 0xDC00:
+            self._high_surrogate = code
+        elif 0xDC00 <= code < 0xE000 and self._high_surrogate is not None:
+            self._emit(chr(0x10000 + ((self._high_surrogate - 0xD800) << 10) + (code - 0xDC00)))
+            self._high_surrogate = None
+        else:
+            self._emit(chr(code))
+
+    def _emit(self, text):
+        self._buf.append(text)
+        self._pending.append(text)
+
+    def _flush(self):
+        if self._pending and self._state.startswith("string"):
+            text = "".join(self._pending)
+            self._pending = []
+            if self.on_delta:
+                self.on_delta(self._key, text)
+
+    # ---------------- other values ----------------
+
+    def _on_raw(self, ch):
+        if self._depth == 0 and not self._raw_in_string and ch in ",}":
+            self._finish_raw()
+            self._on_after_value(ch)
+            return
+        self._raw_char(ch)
+
+    def _raw_char(self, ch):
+        self._raw_text.append(ch)
+        if self._raw_in_string:
+            if self._raw_escape:
+                self._raw_escape = False
+            elif ch == "\\":
+                self._raw_escape = True
+            elif ch == '"':
+                self._raw_in_string = False
+        elif ch == '"':
+            self._raw_in_string = True
+        elif ch in "[{":
+            self._depth += 1
+        elif ch in "]}":
+            self._depth -= 1
+            if self._depth == 0:
+                self._finish_raw()
+                self._state = "after_value"
+
+    def _finish_raw(self):
+        try:
+            value = json.loads("".join(self._raw_text))
+        except ValueError:
+            value = None
+        if isinstance(value, list) and value and all(isinstance(v, str) for v in value):
+            self._finish_value("\n\n".join(value))
+        else:
+            self.malformed.add(self._key)
+
+    def _finish_value(self, value):
+        if not value.strip():
+            self.malformed.add(self._key)
+            return
+        self.malformed.discard(self._key)
+        self.values[self._key] = value
+        if self.on_value:
+            self.on_value(self._key, value)
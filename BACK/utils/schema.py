@@ -0,0 +1,19 @@
+from typing import List, Literal
+from pydantic import BaseModel, Field
+
+
+class Schema(BaseModel):
+    overview: str = Field(..., min_length=30)
+    format: str
+    npages: int
+    # "sections": one LLM call per section; "single": the whole paper as one JSON response
+    mode: Literal["sections", "single"] = "sections"
+
+
+class RegenerateSchema(BaseModel):
+    # section names as in the paper, e.g. "Methodology", "References"
+    sections: List[str] = Field(..., min_length=1)
+
+
+class BatchSchema(BaseModel):
+    papers: List[Schema] = Field(..., min_length=1)
@@ -0,0 +1,120 @@
+import re
+
+# Whole lines that are LLM noise rather than paper text: echoed section headings
+# ("Introduction", "## II. Methodology:", "**Results**"), "Title: ..." lines and
+# separators ("---", "===", "* * *")
+JUNK_LINE = re.compile(
+    r"[#*\s]*(?:(?:[IVXLC]+|\d+)\.\s*)?"
+    r"(?:abstract|introduction|literature\s+review|related\s+work|methodology|methods?"
+    r"|results?(?:\s+and\s+discussion)?|discussion|conclusions?|references?)"
+    r"\s*:?[*\s]*"
+    r"|[*#\s]*title\s*\**\s*:.*"
+    r"|[-_=*](?:\s*[-_=*]){2,}",
+    re.I,
+)
+
+# Starts of lines that may still turn out to be junk however long they get
+JUNK_PREFIX = re.compile(r"[*#\s]*title\s*\**\s*:|[-_=*\s]+$", re.I)
+
+# A partial line longer than this that is not a junk prefix can no longer be a heading
+DECIDE_AFTER = 64
+
+REFERENCE_START = re.compile(r"\[\d+\]")
+
+
+class StreamCleaner:
+    """Incremental, line-buffered version of clean_text for streamed text.
+
+    `feed(chunk)` returns the cleaned text that is final so far and `close()`
+    the rest; concatenated they equal `clean_text` of the whole input. Lines
+    are buffered only until they are long enough to rule out a heading, so
+    paragraphs still stream through as they are generated. Kept lines are
+    joined with `separator`; previews rendered as Markdown pass "\n\n" so each
+    line stays its own paragraph.
+    """
+
+    def __init__(self, separator="\n"):
+        self.separator = separator
+        self._pending = ""        # start of the current line, not yet known to be kept
+        self._streaming = False   # current line is kept and partly emitted
+        self._held = ""           # trailing whitespace of the streamed line, emitted only if text follows
+        self._started = False     # a line has been emitted (the next one needs a separator)
+
+    def feed(self, chunk):
+        if self._streaming and "\n" not in chunk:
+            # the common case mid-paragraph: pass the token through
+            text = self._held + chunk
+            body = text.rstrip()
+            self._held = text[len(body):]
+            return body
+        out = []
+        for i, part in enumerate(chunk.split("\n")):
+            if i:
+                self._end_line(out)
+            if part:
+                self._add(part, out)
+        return "".join(out)
+
+    def close(self):
+        out = []
+        self._end_line(out)
+        return "".join(out)
+
+    def _add(self, part, out):
+        if self._streaming:
+            text = self._held + part
+            body = text.rstrip()
+            self._held = text[len(body):]
+            if body:
+                out.append(body)
+            return
+
+        self._pending += part
+        text = self._pending.lstrip()
+        if len(text) > DECIDE_AFTER and not JUNK_PREFIX.match(text):
+            self._pending = ""
+            self._streaming = True
+            body = text.rstrip()
+            self._held = text[len(body):]
+            self._emit_line(body, out)
+
+    def _end_line(self, out):
+        if self._streaming:
+            self._streaming = False
+            self._held = ""
+            return
+        text = self._pending.strip()
+        self._pending = ""
+        if text and not JUNK_LINE.fullmatch(text):
+            self._emit_line(text, out)
+
+    def _emit_line(self, text, out):
+        if self._started:
+            out.append(self.separator)
+        self._started = True
+        out.append(text)
+
+
+def clean_text(text: str) -> str:
+    """Drop blank lines and LLM noise (echoed headings, Title: lines, separators)"""
+    cleaner = StreamCleaner()
+    return cleaner.feed(text) + cleaner.close()
+
+
+def split_references(refs):
+    """One entry per reference: a blank line or a "[n]" at the start of a line begins a new one"""
+    if not isinstance(refs, str):
+        return refs
+
+    items, current = [], []
+    for line in refs.split("\n"):
+        text = line.strip()
+        if not text or REFERENCE_START.match(text):
+            if current:
+                items.append("\n".join(current))
+                current = []
+        if text and not JUNK_LINE.fullmatch(text):
+            current.append(text)
+    if current:
+        items.append("\n".join(current))
+    return items
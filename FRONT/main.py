@@ -4,45 +4,126 @@ import streamlit as st
 import requests
 import json
 import os
+import time
+from requests.adapters import HTTPAdapter
+
+BACKEND_URL = os.getenv("PAPERFORGE_BACKEND_URL", "http://127.0.0.1:8000")
+DOCX_MIME = "application/vnd.openxmlformats-officedocument.wordprocessingml.document"
+
+# Papers expire on the backend after this long, so cached downloads need not outlive them
+ARTIFACT_TTL = float(os.getenv("ARTIFACT_TTL", "3600"))
+
+# Seconds between live preview redraws of one section; every redraw re-renders its whole text
+PREVIEW_INTERVAL = float(os.getenv("PAPERFORGE_PREVIEW_INTERVAL", "0.25"))
 
 st.set_page_config(page_title="PaperForge", page_icon="📄")
 
 st.title("📄 PaperForge")
 
-# Test download button for existing file
-st.sidebar.title("🔧 Test Downloads")
-if st.sidebar.button("📥 Download Existing Paper"):
+# Results survive reruns (every widget click is one) without talking to the backend again
+st.session_state.setdefault("paper_id", None)
+st.session_state.setdefault("preview", {})
+st.session_state.setdefault("sidebar_paper_id", None)
+st.session_state.setdefault("regenerated_paper_id", None)
+
+
+@st.cache_resource
+def http_session():
+    """One keep-alive connection pool to the backend, shared by every rerun and browser tab"""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=16)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+@st.cache_resource(ttl=ARTIFACT_TTL, max_entries=16, show_spinner=False)
+def fetch_paper(paper_id):
+    """Download a rendered paper from the backend, once per paper id.
+
+    Papers never change once stored, and cache_resource hands back the same
+    bytes object on every rerun instead of a copy.
+    """
+    response = http_session().get(f"{BACKEND_URL}/papers/{paper_id}", timeout=60)
+    response.raise_for_status()
+    return response.content
+
+
+def download_button(container, label, paper_id, file_name, key):
+    # on_click="ignore": downloading does not rerun the script
+    container.download_button(
+        label,
+        fetch_paper(paper_id),
+        file_name=file_name,
+        mime=DOCX_MIME,
+        key=key,
+        on_click="ignore"
+    )
+
+
+# Re-download a paper generated earlier by its id
+st.sidebar.title("🔧 Downloads")
+sidebar_paper_id = st.sidebar.text_input("Paper ID").strip()
+if st.sidebar.button("📥 Fetch Paper") and sidebar_paper_id:
+    st.session_state.sidebar_paper_id = sidebar_paper_id
+if st.session_state.sidebar_paper_id:
     try:
-        # Get path to back/output.docx
-        current_dir = os.path.dirname(os.path.abspath(__file__))
-        parent_dir = os.path.dirname(current_dir)
-        file_path = os.path.join(parent_dir, "back", "output.docx")
-        
-        if os.path.exists(file_path):
-            with open(file_path, "rb") as f:
-                st.sidebar.download_button(
-                    "📄 Download output.docx",
-                    f,
-                    file_name="output.docx",
-                    mime="application/vnd.openxmlformats-officedocument.wordprocessingml.document",
-                    key="sidebar_download"
-                )
+        download_button(
+            st.sidebar, "📄 Download paper.docx", st.session_state.sidebar_paper_id, "paper.docx", "sidebar_download"
+        )
+    except requests.exceptions.HTTPError:
+        st.session_state.sidebar_paper_id = None
+        st.sidebar.error("❌ Paper not found or expired")
+    except Exception as e:
+        st.session_state.sidebar_paper_id = None
+        st.sidebar.error(f"❌ Error: {str(e)}")
+
+# Regenerate only some sections of that paper; the rest keep their text
+PAPER_SECTIONS = ["Title", "Abstract", "Introduction", "Literature Review", "Methodology", "Results", "References"]
+regen_sections = st.sidebar.multiselect("Sections to regenerate", PAPER_SECTIONS)
+if st.sidebar.button("🔁 Regenerate Sections") and sidebar_paper_id and regen_sections:
+    try:
+        with st.sidebar.status("🤖 Regenerating sections...", state="running"):
+            response = http_session().post(
+                f"{BACKEND_URL}/papers/{sidebar_paper_id}/regenerate",
+                json={"sections": regen_sections},
+                timeout=180
+            )
+        if response.status_code != 200:
+            st.sidebar.error(f"❌ {response.json().get('detail', 'Regeneration failed')}")
         else:
-            st.sidebar.error("❌ File not found at back/output.docx")
+            st.session_state.regenerated_paper_id = response.json()["paper_id"]
+    except Exception as e:
+        st.sidebar.error(f"❌ Error: {str(e)}")
+if st.session_state.regenerated_paper_id:
+    st.sidebar.caption(f"New Paper ID: `{st.session_state.regenerated_paper_id}`")
+    try:
+        download_button(
+            st.sidebar, "📄 Download regenerated paper.docx", st.session_state.regenerated_paper_id,
+            "paper.docx", "regenerated_download"
+        )
     except Exception as e:
         st.sidebar.error(f"❌ Error: {str(e)}")
 
 project_description = st.text_area("🧠 Project Overview", height=200)
 paper_format = st.selectbox("📑 Format", ["IEEE"])
 pages = st.slider("📄 Pages", 4, 20, 8)
+mode = st.radio(
+    "🧩 Generation mode",
+    ["sections", "single"],
+    format_func=lambda m: "One call per section" if m == "sections" else "Single call (JSON)",
+    horizontal=True,
+)
 
 
 def process_sse_stream(url, payload):
     """Process Server-Sent Events stream from FastAPI"""
     
     # Create separate containers for each spinner
+    queue_container = st.empty()
     validation_container = st.empty()
     prompt_container = st.empty()
+    digest_container = st.empty()
     llm_container = st.empty()
     doc_container = st.empty()
     
@@ -57,6 +138,11 @@ def process_sse_stream(url, payload):
             "message": "🧠 Generating academic prompt...",
             "spinner": None
         },
+        "digest": {
+            "container": digest_container,
+            "message": "🗜️ Condensing the project overview...",
+            "spinner": None
+        },
         "llm_response": {
             "container": llm_container,
             "message": "🤖 Getting response from LLM...",
@@ -69,17 +155,34 @@ def process_sse_stream(url, payload):
         }
     }
     
-    output_file = None
+    # Live preview of sections as the LLM streams them
+    preview_expander = st.expander("📝 Live preview", expanded=True)
+    section_text = {}
+    section_slots = {}
+    last_drawn = {}
+
+    def draw(section):
+        # chunks are joined only when drawn, and draws are throttled per section
+        section_slots[section].markdown("".join(section_text[section]))
+        last_drawn[section] = time.monotonic()
+    
+    paper_id = None
+    response = None
     
     try:
-        response = requests.post(
+        response = http_session().post(
             url, 
             json=payload, 
             stream=True, 
-            timeout=180,
+            timeout=(10, 180),
             headers={'Accept': 'text/event-stream'}
         )
         
+        if response.status_code == 429:
+            retry_after = response.headers.get("Retry-After", "a few")
+            st.warning(f"⏳ The server is at capacity. Please try again in {retry_after} seconds.")
+            return None
+        
         # Process the stream line by line
         for line in response.iter_lines():
             if line:
@@ -96,7 +199,13 @@ def process_sse_stream(url, payload):
                         event_data = data.get("data", {})
                         
                         # Handle each stage
-                        if status == "started":
+                        if stage == "queued":
+                            if status == "waiting":
+                                queue_container.info(f"⏳ Waiting for a free slot... position {event_data.get('position')} in queue")
+                            else:
+                                queue_container.empty()
+                        
+                        elif status == "started":
                             if stage in spinners:
                                 spinner_info = spinners[stage]
                                 spinner_info["spinner"] = spinner_info["container"].status(
@@ -105,6 +214,23 @@ def process_sse_stream(url, payload):
                                     state="running"
                                 )
                         
+                        elif status == "section_delta":
+                            section = event_data.get("section")
+                            if section not in section_slots:
+                                with preview_expander:
+                                    st.markdown(f"**{section}**")
+                                    section_slots[section] = st.empty()
+                                last_drawn[section] = 0.0
+                            if event_data.get("reset"):
+                                section_text[section] = []
+                            section_text.setdefault(section, []).append(event_data.get("chunk", ""))
+                            if time.monotonic() - last_drawn[section] >= PREVIEW_INTERVAL:
+                                draw(section)
+                        
+                        elif status == "section_completed":
+                            if event_data.get("section") in section_slots:
+                                draw(event_data["section"])
+                        
                         elif status == "completed":
                             if stage in spinners and spinners[stage]["spinner"]:
                                 spinners[stage]["spinner"].update(
@@ -117,14 +243,17 @@ def process_sse_stream(url, payload):
                             return None
                         
                         elif status == "success":
-                            output_file = event_data.get("file")
+                            paper_id = event_data.get("paper_id")
+                            st.session_state.preview = {
+                                section: "".join(chunks) for section, chunks in section_text.items()
+                            }
                             st.success("✅ Research paper generated successfully!")
-                            return output_file
+                            return paper_id
                     
                     except json.JSONDecodeError:
                         continue
         
-        return output_file
+        return paper_id
         
     except requests.exceptions.Timeout:
         st.error("❌ Request timed out. Please try again.")
@@ -135,6 +264,10 @@ def process_sse_stream(url, payload):
     except Exception as e:
         st.error(f"❌ An error occurred: {str(e)}")
         return None
+    finally:
+        # hands the connection back to the session's pool
+        if response is not None:
+            response.close()
 
 
 if st.button("⚡ Forge Research Paper"):
@@ -147,37 +280,31 @@ if st.button("⚡ Forge Research Paper"):
     payload = {
         "overview": project_description,
         "format": paper_format,
-        "npages": pages
+        "npages": pages,
+        "mode": mode
     }
     
     # Process the streaming response
-    output_file = process_sse_stream(
-        "http://127.0.0.1:8000/generate-docs-stream",
+    st.session_state.paper_id = None
+    st.session_state.preview = {}
+    st.session_state.paper_id = process_sse_stream(
+        f"{BACKEND_URL}/generate-docs-stream",
         payload
     )
-    
-    # Download button if successful
-    if output_file:
-        try:
-            # Get the parent directory (where both front/ and back/ are located)
-            current_dir = os.path.dirname(os.path.abspath(__file__))
-            parent_dir = os.path.dirname(current_dir)
-            
-            # Construct path to back/output.docx
-            file_path = os.path.join(parent_dir, "back", output_file)
-            
-            # Check if file exists
-            if not os.path.exists(file_path):
-                st.error(f"❌ Generated file not found at: {file_path}")
-                st.stop()
-            
-            with open(file_path, "rb") as f:
-                file_bytes = f.read()
-                st.download_button(
-                    "📥 Download Research Paper",
-                    file_bytes,
-                    file_name=os.path.basename(output_file),
-                    mime="application/vnd.openxmlformats-officedocument.wordprocessingml.document"
-                )
-        except Exception as e:
-            st.error(f"❌ Error loading file: {str(e)}")
\ No newline at end of file
+
+elif st.session_state.preview:
+    # a rerun after a generation: show the finished text without streaming it again
+    with st.expander("📝 Preview", expanded=False):
+        for section, text in st.session_state.preview.items():
+            st.markdown(f"**{section}**")
+            st.markdown(text)
+
+# Download button if successful
+if st.session_state.paper_id:
+    try:
+        st.caption(f"Paper ID: `{st.session_state.paper_id}`")
+        download_button(
+            st, "📥 Download Research Paper", st.session_state.paper_id, "research_paper.docx", "paper_download"
+        )
+    except Exception as e:
+        st.error(f"❌ Error loading file: {str(e)}")